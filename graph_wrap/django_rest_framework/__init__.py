@@ -1,9 +1,21 @@
 from graph_wrap.django_rest_framework.graphql_view import graphql_view
+from graph_wrap.shared.schema_cache import SchemaCache, urlconf_cache_key
 
 
-def schema():
+def _build_schema(timings=None):
     from graph_wrap.django_rest_framework.schema_factory import SchemaFactory
-    return SchemaFactory.create_from_api()
+    return SchemaFactory.create_from_api(timings=timings)
+
+
+schema_cache = SchemaCache(_build_schema, urlconf_cache_key)
+
+
+def schema():
+    return schema_cache.get()
+
+
+def invalidate_schema():
+    schema_cache.invalidate()
 
 
-__all__ = ['schema', 'graphql_view']
+__all__ = ['schema', 'invalidate_schema', 'graphql_view']
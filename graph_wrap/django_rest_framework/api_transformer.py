@@ -12,7 +12,7 @@ import six
 
 
 class ApiTransformer:
-    def __init__(self, api, type_mapping=None, seen_nested_serializers=None):
+    def __init__(self, api, type_mapping=None, type_names=None):
         self._api = api
         self._root_serializer = api.get_serializer()
         self._all_serializers = []
@@ -20,13 +20,14 @@ class ApiTransformer:
         self._root_serializer, *self._nested_serializers = self._all_serializers
         self._root_graphene_type_name = u'{}_type'.format(self._api.basename)
         self.type_mapping = type_mapping or dict()
-        self.seen_nested_serializers = seen_nested_serializers or dict()
+        self.type_names = (
+            type_names if type_names is not None else SerializerTypeNames())
 
     def root_type(self):
         root_type = SerializerTransformer(
             self._root_serializer,
             self.type_mapping,
-            seen_nested_serializers=self.seen_nested_serializers,
+            type_names=self.type_names,
         ).graphene_object_type()
         return root_type
 
@@ -36,7 +37,7 @@ class ApiTransformer:
             nested_transformed = SerializerTransformer(
                 nested,
                 type_mapping=self.type_mapping,
-                seen_nested_serializers=self.seen_nested_serializers,
+                type_names=self.type_names,
             ).graphene_object_type()
             non_root_types.append(nested_transformed)
         return non_root_types
@@ -63,17 +64,44 @@ class ApiTransformer:
         return None
 
 
+class SerializerTypeNames(object):
+    """The graphene type names of the serializer classes of each model.
+
+    The types of a model are named <model>_type, <model>_type_2, ...
+    in the order their serializer classes are added, and a serializer
+    class keeps its name across all the APIs of a schema.
+    """
+    def __init__(self):
+        self._names_by_model = dict()
+
+    def type_name(self, model, serializer_cls):
+        """The name of serializer_cls' type, whether added yet or not."""
+        names = self._names_by_model.get(model, {})
+        try:
+            return names[serializer_cls]
+        except KeyError:
+            type_name = '{}_type'.format(model)
+            if names:
+                type_name = '{}_{}'.format(type_name, len(names) + 1)
+            return type_name
+
+    def add(self, model, serializer_cls, type_name):
+        self._names_by_model.setdefault(model, {}).setdefault(
+            serializer_cls, type_name)
+
+
 class SerializerTransformer(object):
     def __init__(
             self,
             serializer,
             type_mapping=None,
-            seen_nested_serializers=None,
+            type_names=None,
     ):
         self._serializer = serializer
         self.type_mapping = type_mapping if type_mapping is not None else dict()
-        self.seen_nested_serializers = (
-            seen_nested_serializers if seen_nested_serializers is not None else dict())
+        self.type_names = (
+            type_names if type_names is not None else SerializerTypeNames())
+        self._model = None
         self._graphene_type_name = self._build_graphene_type_name()
         self._graphene_object_type_class_attrs = dict()
 
@@ -89,7 +117,12 @@ class SerializerTransformer(object):
                 self._graphene_object_type_class_attrs,
             )
             self.type_mapping[self._graphene_type_name] = graphene_type
-            self.seen_nested_serializers[self._graphene_type_name] = self._serializer
+            if self._model is not None:
+                self.type_names.add(
+                    self._model,
+                    self._serializer.__class__,
+                    self._graphene_type_name,
+                )
             return graphene_type
 
     def _build_graphene_type_name(self):
@@ -105,21 +138,12 @@ class SerializerTransformer(object):
             model = named_field.child.Meta.model.__name__.lower()
         else:
             model = named_field.Meta.model.__name__.lower()
-        type_name = '{}_type'.format(model)
-        types_for_model = [
-            t for t in self.type_mapping if t.startswith(type_name)]
-        seen_serializers_for_model = [
-            x for x in self.seen_nested_serializers.items() if x[0] in types_for_model]
-        for type_name, serializer in seen_serializers_for_model:
-            if serializer.__class__ == self._serializer.__class__:
-                return type_name
-        if types_for_model:
-            type_name = '{}_{}'.format(type_name, len(types_for_model) + 1)
-        return type_name
+        self._model = model
+        return self.type_names.type_name(model, self._serializer.__class__)
 
     def _add_field_data(self, field):
         field_transformer = FieldTransformer.get_transformer(
-            field, self.type_mapping, self.seen_nested_serializers)
+            field, self.type_mapping, self.type_names)
         graphene_field = field_transformer.graphene_field()
         self._graphene_object_type_class_attrs[field.field_name] = graphene_field
         resolver_method_name = 'resolve_{}'.format(field.field_name)
@@ -127,44 +151,74 @@ class SerializerTransformer(object):
             field_transformer.graphene_field_resolver_method())
 
 
-class FieldTransformer:
+class FieldTransformerMeta(type):
+    """Metaclass for FieldTransformers.
+
+    Tracks which FieldTransformer handles which serializer field
+    classes: a FieldTransformer subclass registers itself for each
+    of the 'field_classes' it declares. A field is then transformed
+    by the transformer registered for the nearest class in its MRO
+    (its own class first), which is looked up once per concrete field
+    class. Custom field classes can be supported by declaring a
+    transformer for them, or by registering an existing one:
+
+        FieldTransformerMeta.register(MoneyField, StringValuedFieldTransformer)
+    """
+    registry = dict()
+    _resolved = dict()
+
+    def __new__(mcs, name, bases, attrs):
+        transformer_class = super(FieldTransformerMeta, mcs).__new__(
+            mcs, name, bases, attrs)
+        # Only the classes declared by the class itself, which are
+        # not inherited by its subclasses.
+        for field_class in attrs.get('field_classes', ()):
+            mcs.register(field_class, transformer_class)
+        return transformer_class
+
+    @classmethod
+    def register(mcs, field_class, transformer_class):
+        """Transform field_class (and its subclasses) with transformer_class."""
+        mcs.registry[field_class] = transformer_class
+        mcs._resolved.clear()
+
+    @classmethod
+    def resolve(mcs, field_class):
+        """The transformer class of the fields of field_class, if any."""
+        try:
+            return mcs._resolved[field_class]
+        except KeyError:
+            transformer_class = next(
+                (mcs.registry[cls] for cls in field_class.__mro__
+                 if cls in mcs.registry),
+                None,
+            )
+            mcs._resolved[field_class] = transformer_class
+            return transformer_class
+
+
+class FieldTransformer(six.with_metaclass(FieldTransformerMeta, object)):
     graphene_type = None
+    field_classes = ()
 
-    def __init__(self, field, type_mapping=None, seen_nested_serializers=None):
+    def __init__(self, field, type_mapping=None, type_names=None):
         self._field = field
         self.type_mapping = type_mapping if type_mapping is not None else dict()
-        self.seen_nested_serializers = seen_nested_serializers if seen_nested_serializers is not None else dict()
+        self.type_names = (
+            type_names if type_names is not None else SerializerTypeNames())
 
     @classmethod
     def get_transformer(
-            cls, field, type_mapping, seen_nested_serializers=None):
+            cls, field, type_mapping, type_names=None):
         if hasattr(field, 'child') and isinstance(
                 field.child, serializers.ModelSerializer):
             # for ListSerializers from M2M fields
-            return RelatedValuedFieldTransformer(field, type_mapping, seen_nested_serializers)
-
-        base_types = {
-            serializers.BooleanField: BooleanValuedFieldTransformer,
-            serializers.CharField: StringValuedFieldTransformer,
-            serializers.DateField: StringValuedFieldTransformer,
-            serializers.DateTimeField: StringValuedFieldTransformer,
-            serializers.DecimalField: StringValuedFieldTransformer,
-            serializers.DictField: DictValuedFieldTransformer,
-            serializers.FloatField: FloatValuedFieldTransformer,
-            serializers.IntegerField: IntegerValuedFieldTransformer,
-            serializers.ListField: ListValuedFieldTransformer,
-            serializers.ManyRelatedField: ListOfStringsValuedFieldTransformer,
-            serializers.ModelSerializer: RelatedValuedFieldTransformer,
-            serializers.HyperlinkedRelatedField: HyperlinkedRelatedFieldTransformer,
-            serializers.RelatedField: StringValuedFieldTransformer,
-            serializers.TimeField: StringValuedFieldTransformer,
-            serializers.UUIDField: UUIDValuedFieldTransformer,
-        }
-        transformer_class = next(
-            (v for t, v in base_types.items() if isinstance(field, t)),
-            GenericValuedFieldTransformer,
+            return RelatedValuedFieldTransformer(field, type_mapping, type_names)
+        transformer_class = (
+            FieldTransformerMeta.resolve(field.__class__) or
+            GenericValuedFieldTransformer
         )
-        return transformer_class(field, type_mapping, seen_nested_serializers)
+        return transformer_class(field, type_mapping, type_names)
 
     def graphene_field(self):
         pass
@@ -189,9 +243,11 @@ class ScalarValuedFieldTransformer(FieldTransformer):
 
 
 class RelatedValuedFieldTransformer(FieldTransformer):
-    def __init__(self, field, type_mapping=None, seen_nested_serializers=None):
+    field_classes = (serializers.ModelSerializer,)
+
+    def __init__(self, field, type_mapping=None, type_names=None):
         super(RelatedValuedFieldTransformer, self).__init__(
-            field, type_mapping, seen_nested_serializers)
+            field, type_mapping, type_names)
         self._field_class = field.__class__
         self._is_to_many = getattr(field, 'many', False)
 
@@ -229,33 +285,18 @@ class RelatedValuedFieldTransformer(FieldTransformer):
             model = self._field.child.Meta.model.__name__.lower()
         else:
             model = self._field.Meta.model.__name__.lower()
-        return self._get_type_number_for_model(model, serializer_cls)
-
-    def _get_type_number_for_model(self, model, serializer_cls):
-        type_name = '{}_type'.format(model)
-        types_for_model = [
-            t for t in self.type_mapping if t.startswith(type_name)]
-        seen_serializers_for_model = [
-            x for x in self.seen_nested_serializers.items() if x[0] in types_for_model]
-        for type_name, serializer in seen_serializers_for_model:
-            if serializer.__class__ == serializer_cls:
-                return type_name
-        if types_for_model:
-            type_name = '{}_{}'.format(type_name, len(types_for_model) + 1)
-        return type_name
+        return self.type_names.type_name(model, serializer_cls)
 
 
 class HyperlinkedRelatedFieldTransformer(RelatedValuedFieldTransformer):
+    field_classes = (serializers.HyperlinkedRelatedField,)
+
     def _build_graphene_type_name(self):
         from graph_wrap.django_rest_framework.schema_factory import SchemaFactory
-        views = SchemaFactory.usable_views()
-        related_view_name = self._field.view_name.split(':')[-1]  # Strip namespace (if present)
-        related_view_name = related_view_name.split('-')[0]
-        related_view_set = next(
-            (v for v in views if v.basename == related_view_name))
+        related_view_set = SchemaFactory.usable_view(self._field.view_name)
         related_serializer = related_view_set.get_serializer()
         model = related_serializer.Meta.model.__name__.lower()
-        return self._get_type_number_for_model(model, related_serializer.__class__)
+        return self.type_names.type_name(model, related_serializer.__class__)
 
 
 class GenericValuedFieldTransformer(ScalarValuedFieldTransformer):
@@ -264,22 +305,34 @@ class GenericValuedFieldTransformer(ScalarValuedFieldTransformer):
 
 class StringValuedFieldTransformer(ScalarValuedFieldTransformer):
     graphene_type = graphene.String
+    field_classes = (
+        serializers.CharField,
+        serializers.DateField,
+        serializers.DateTimeField,
+        serializers.DecimalField,
+        serializers.RelatedField,
+        serializers.TimeField,
+    )
 
 
 class UUIDValuedFieldTransformer(ScalarValuedFieldTransformer):
     graphene_type = graphene.UUID
+    field_classes = (serializers.UUIDField,)
 
 
 class IntegerValuedFieldTransformer(ScalarValuedFieldTransformer):
     graphene_type = graphene.Int
+    field_classes = (serializers.IntegerField,)
 
 
 class FloatValuedFieldTransformer(ScalarValuedFieldTransformer):
     graphene_type = graphene.Float
+    field_classes = (serializers.FloatField,)
 
 
 class BooleanValuedFieldTransformer(ScalarValuedFieldTransformer):
     graphene_type = graphene.Boolean
+    field_classes = (serializers.BooleanField,)
 
 
 class DecimalValuedFieldTransformer(ScalarValuedFieldTransformer):
@@ -297,10 +350,12 @@ class Dict(graphene.Scalar):
 
 class DictValuedFieldTransformer(ScalarValuedFieldTransformer):
     graphene_type = Dict
+    field_classes = (serializers.DictField,)
 
 
 class ListValuedFieldTransformer(FieldTransformer):
     graphene_type = GenericScalar
+    field_classes = (serializers.ListField,)
 
     def graphene_field(self):
         return graphene.List(
@@ -318,4 +373,5 @@ class ListValuedFieldTransformer(FieldTransformer):
 class ListOfStringsValuedFieldTransformer(
         ListValuedFieldTransformer):
     graphene_type = graphene.String
+    field_classes = (serializers.ManyRelatedField,)
 
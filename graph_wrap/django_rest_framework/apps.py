@@ -0,0 +1,49 @@
+from __future__ import unicode_literals
+
+import logging
+
+from django.apps import AppConfig
+
+logger = logging.getLogger(__name__)
+
+
+class GraphWrapConfig(AppConfig):
+    """Optional app config which builds the schema at start-up.
+
+    Add 'graph_wrap.django_rest_framework.apps.GraphWrapConfig' to
+    INSTALLED_APPS and set GRAPH_WRAP_WARM_UP_SCHEMA to True to move
+    the cost of building the schema from the first /graphql request
+    of each process to process start-up (see warm_up_enabled). The
+    time spent in each phase of the build is logged at INFO level
+    on the 'graph_wrap.shared.schema_cache' logger. The app config
+    also connects the result cache invalidation (see
+    connect_cached_resources).
+    """
+    name = 'graph_wrap.django_rest_framework'
+    label = 'graph_wrap_django_rest_framework'
+    verbose_name = 'GraphWrap (Django REST Framework)'
+
+    def ready(self):
+        from graph_wrap.django_rest_framework import schema_cache
+        from graph_wrap.shared.result_cache import connect_cached_resources
+        from graph_wrap.shared.schema_cache import warm_up_enabled
+        if warm_up_enabled():
+            try:
+                schema_cache.warm_up()
+            except Exception:
+                # Don't prevent the process from starting; the schema
+                # will be built (and the error raised) on first use.
+                logger.exception('Unable to build graph_wrap schema')
+        try:
+            connect_cached_resources(_resource_models())
+        except Exception:
+            # Cached resources are still connected on first use.
+            logger.exception(
+                'Unable to connect graph_wrap result cache invalidation')
+
+
+def _resource_models():
+    from .query_resolver import viewset_model
+    from .schema_snapshot import registered_viewsets
+    for viewset, basename in registered_viewsets():
+        yield basename, viewset_model(viewset)
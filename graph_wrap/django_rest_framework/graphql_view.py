@@ -1,5 +1,6 @@
 from django.views.decorators.csrf import csrf_exempt
-from graphene_django.views import GraphQLView
+
+from graph_wrap.shared.graphql_view import GraphWrapGraphQLView
 
 
 # See https://github.com/PaulGilmartin/graph_wrap/issues/5 for csrf_exempt
@@ -8,6 +9,6 @@ from graphene_django.views import GraphQLView
 def graphql_view(request):
     from graph_wrap.django_rest_framework import schema
     schema = schema()
-    view = GraphQLView.as_view(schema=schema)
+    view = GraphWrapGraphQLView.as_view(schema=schema)
     return view(request)
 
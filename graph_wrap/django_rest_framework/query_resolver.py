@@ -1,18 +1,63 @@
 from __future__ import unicode_literals
 
 from functools import partial
+from itertools import islice
 
-from rest_framework import serializers
+from django.db.models import QuerySet, prefetch_related_objects
 
-from graph_wrap.shared.query_resolver import QueryResolverBase
+from rest_framework import exceptions, serializers
+from rest_framework.generics import GenericAPIView
+from rest_framework.mixins import RetrieveModelMixin
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+
+from graph_wrap.shared.batching import BatchedSingleItemResolverMixin
+from graph_wrap.shared.column_pruning import column_pruning_enabled
+from graph_wrap.shared.pagination import (
+    PageQueryResolverMixin,
+    PaginationError,
+)
+from graph_wrap.shared.query_resolver import (
+    QueryResolverBase,
+    in_process_responses,
+)
+from .queryset_planner import (
+    QuerysetPlanner,
+    mark_related_view,
+    queryset_planning_enabled,
+)
+from .related_loader import RelatedViewLoader, batch_related_views_enabled
 
 
 class QueryResolver(QueryResolverBase):
+    def __init__(self, field_name, api):
+        super(QueryResolver, self).__init__(field_name, api)
+        # The selected fields are read from each request, so the
+        # generated classes (and the view built from them) do not
+        # depend on the query and can be built once per resolver.
+        self._selected_fields_view = self._build_selected_fields_view(
+            self._build_selected_fields_api())
+
     def _get_response(self, request, **kwargs):
         resolver = self.rest_api_resolver_method(**kwargs)
-        response = resolver(request)
+        return resolver(request)
+
+    def _render(self, response):
+        if in_process_responses() and response.status_code < 400:
+            return response
         return response.render()
 
+    def _response_data(self, response):
+        if not response.is_rendered:
+            return response.data
+        return super(QueryResolver, self)._response_data(response)
+
+    def _resource_name(self):
+        return self._api.basename
+
+    def _resource_model(self):
+        return viewset_model(self._api)
+
     def _build_selected_fields_api(self):
 
         class SelectedFieldsSerializer(self._api.serializer_class):
@@ -32,11 +77,11 @@ class QueryResolver(QueryResolverBase):
 
                 for field_name, field in serializer.fields.items():
                     if isinstance(field, serializers.HyperlinkedRelatedField):
-                        views = SchemaFactory.usable_views()
-                        related_view_name = field.view_name.split('-')[0]
-                        related_view_set = next(
-                            (v for v in views if v.basename == related_view_name))
+                        related_view_set = SchemaFactory.usable_view(
+                            field.view_name)
                         field = related_view_set.get_serializer()
+                        if batch_related_views_enabled():
+                            mark_related_view(field, related_view_set)
                         serializer.fields[field_name] = field
                     if hasattr(field, 'child'):
                         field = field.child
@@ -47,6 +92,56 @@ class QueryResolver(QueryResolverBase):
         class SelectedFieldsView(self._api.__class__):
             serializer_class = SelectedFieldsSerializer
 
+            def get_queryset(self):
+                queryset = super().get_queryset()
+                if not queryset_planning_enabled():
+                    return queryset
+                planner = QuerysetPlanner(
+                    self.get_serializer(),
+                    prune_columns=column_pruning_enabled(),
+                )
+                return planner.apply(queryset)
+
+            def get_serializer(self, *args, **kwargs):
+                serializer = super().get_serializer(*args, **kwargs)
+                if args and batch_related_views_enabled():
+                    if kwargs.get('many'):
+                        instances = list(args[0])
+                        root = serializer.child
+                    else:
+                        instances = [args[0]]
+                        root = serializer
+                    RelatedViewLoader(self.request).load(root, instances)
+                return serializer
+
+            def retrieve(self, request, *args, **kwargs):
+                if 'batch_pks' not in kwargs:
+                    return super().retrieve(request, *args, **kwargs)
+                return self._batch_retrieve(request, kwargs['batch_pks'])
+
+            def _batch_retrieve(self, request, pks):
+                """Retrieve each of the objects with pks, as one fetch.
+
+                Each object goes through the same queryset filtering
+                and object permission checks as in 'retrieve'. Objects
+                which are not found or not permitted are left out of
+                the response data, a dictionary keyed by str(pk).
+                """
+                queryset = self.filter_queryset(self.get_queryset()).filter(
+                    **{'{}__in'.format(self.lookup_field): pks})
+                objects = []
+                for obj in queryset:
+                    try:
+                        self.check_object_permissions(request, obj)
+                    except exceptions.APIException:
+                        continue
+                    objects.append(obj)
+                serializer = self.get_serializer(objects, many=True)
+                return Response({
+                    str(getattr(obj, self.lookup_field)): data
+                    for obj, data in zip(objects, serializer.data)
+                })
+
         return SelectedFieldsView
 
 
@@ -62,10 +157,58 @@ class AllItemsQueryResolver(QueryResolver):
     def __call__(self, root, info, **kwargs):
         response_json = super(AllItemsQueryResolver, self).__call__(
             root, info, **kwargs)
+        if isinstance(response_json, dict) and 'results' in response_json:
+            # A paginated viewset: the first page, as served by the
+            # list endpoint (see PageQueryResolver for the others).
+            return response_json['results']
         return response_json
 
     def rest_api_resolver_method(self, **kwargs):
-        selected_fields_cls = self._build_selected_fields_api()
+        return self._selected_fields_view
+
+    def stream(self, info, chunk_size, **kwargs):
+        """Iterate over the serialized items, chunk_size at a time.
+
+        The list view is set up and its checks (authentication,
+        permissions and throttling) run as on dispatch, but rather
+        than serializing the whole queryset, the objects are fetched
+        with a chunked iterator and each chunk serialized on its own
+        (prefetching the chunk's related objects, which the iterator
+        does not do). Returns None when the list endpoint cannot be
+        streamed (a failed check, a paginated viewset, ...).
+        """
+        request = self._transform_request(info, **kwargs)
+        view_function = self._selected_fields_view
+        view = view_function.cls(**view_function.initkwargs)
+        if view.paginator is not None:
+            # Checked first, as the fallback to the usual execution
+            # runs the checks again (using up another throttle slot).
+            return None
+        view.action_map = view_function.actions
+        view.setup(request)
+        view.request = view.initialize_request(request)
+        view.headers = view.default_response_headers
+        try:
+            view.initial(view.request)
+        except exceptions.APIException:
+            return None
+        queryset = view.filter_queryset(view.get_queryset())
+        if not isinstance(queryset, QuerySet):
+            return None
+        return self._serialized_chunks(view, queryset, chunk_size)
+
+    def _serialized_chunks(self, view, queryset, chunk_size):
+        prefetch_lookups = queryset._prefetch_related_lookups
+        objects = queryset.iterator(chunk_size=chunk_size)
+        while True:
+            chunk = list(islice(objects, chunk_size))
+            if not chunk:
+                return
+            if prefetch_lookups:
+                prefetch_related_objects(chunk, *prefetch_lookups)
+            yield view.get_serializer(chunk, many=True).data
+
+    def _build_selected_fields_view(self, selected_fields_cls):
         return selected_fields_cls.as_view(
             actions={'get': 'list'},
             suffix='List',
@@ -74,7 +217,67 @@ class AllItemsQueryResolver(QueryResolver):
         )
 
 
-class SingleItemQueryResolver(QueryResolver):
+class PageQueryResolver(PageQueryResolverMixin, QueryResolver):
+    """Callable which acts as resolver for an 'all_items_page' field.
+
+    Pages through the list endpoint using the viewset's
+    pagination_class, or LimitOffsetPagination for viewsets which
+    are not paginated.
+    """
+    def rest_api_resolver_method(self, **kwargs):
+        return self._selected_fields_view
+
+    def _build_selected_fields_view(self, selected_fields_cls):
+        paginated_view_cls = type(
+            selected_fields_cls.__name__,
+            (selected_fields_cls,),
+            dict(pagination_class=self._pagination_class()),
+        )
+        return paginated_view_cls.as_view(
+            actions={'get': 'list'},
+            suffix='List',
+            basename=self._api.basename,
+            detail=False,
+        )
+
+    def _pagination_class(self):
+        return self._api.pagination_class or LimitOffsetPagination
+
+    def _pagination_params(self, size, offset):
+        paginator = self._pagination_class()()
+        params = dict()
+        if size is not None:
+            size_param = (
+                getattr(paginator, 'limit_query_param', None) or
+                getattr(paginator, 'page_size_query_param', None)
+            )
+            if not size_param:
+                raise PaginationError(
+                    '{} does not allow setting the page size.'.format(
+                        paginator.__class__.__name__))
+            params[size_param] = str(size)
+        if offset is not None:
+            offset_param = getattr(paginator, 'offset_query_param', None)
+            if not offset_param:
+                raise PaginationError(
+                    '{} does not support offsets.'.format(
+                        paginator.__class__.__name__))
+            params[offset_param] = str(offset)
+        return params
+
+    def _page(self, data):
+        if isinstance(data, list):
+            # No page size was requested, nor configured.
+            return data, None, None, len(data)
+        return (
+            data['results'],
+            data.get('next'),
+            data.get('previous'),
+            data.get('count'),
+        )
+
+
+class SingleItemQueryResolver(BatchedSingleItemResolverMixin, QueryResolver):
     """Callable which acts as resolver for an 'single item' field' on the Query.
 
     For example, if we had an ProfileAPI with underlying
@@ -86,13 +289,43 @@ class SingleItemQueryResolver(QueryResolver):
      in REST terms)
     """
     def rest_api_resolver_method(self, **kwargs):
-        selected_fields_cls = self._build_selected_fields_api()
-        return partial(
-            selected_fields_cls.as_view(
-                actions={'get': 'retrieve'},
-                suffix='Instance',
-                basename=self._api.basename,
-                detail=True,
-            ),
-            pk=kwargs['id'],
+        if 'batch_pks' in kwargs:
+            return partial(
+                self._selected_fields_view, batch_pks=kwargs['batch_pks'])
+        return partial(self._selected_fields_view, pk=kwargs['id'])
+
+    def _batch_items(self, data, item_ids):
+        return data
+
+    def _batchable(self):
+        """Whether the view's object lookup is a plain field lookup.
+
+        The batch filters the view's queryset on lookup_field and
+        serializes the objects itself, so views customising retrieve
+        or get_object, looking up through a relation or under another
+        URL kwarg are dispatched item by item.
+        """
+        view = self._api.__class__
+        return (
+            getattr(view, 'retrieve', None) is RetrieveModelMixin.retrieve and
+            view.get_object is GenericAPIView.get_object and
+            '__' not in view.lookup_field and
+            view.lookup_url_kwarg in (None, view.lookup_field)
+        )
+
+    def _build_selected_fields_view(self, selected_fields_cls):
+        return selected_fields_cls.as_view(
+            actions={'get': 'retrieve'},
+            suffix='Instance',
+            basename=self._api.basename,
+            detail=True,
         )
+
+
+def viewset_model(viewset):
+    """The Django model of a viewset (class or instance), if any."""
+    queryset = getattr(viewset, 'queryset', None)
+    if queryset is not None:
+        return queryset.model
+    meta = getattr(viewset.serializer_class, 'Meta', None)
+    return getattr(meta, 'model', None)
@@ -0,0 +1,146 @@
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet
+from rest_framework import serializers
+from rest_framework.serializers import ListSerializer
+
+from graph_wrap.shared.column_pruning import model_column, only_columns
+
+
+class QuerysetPlanner(object):
+    """Plans select_related/prefetch_related calls for a serializer.
+
+    Given a serializer whose fields have already been restricted to
+    those selected in the GraphQL query (see SelectedFieldsSerializer),
+    maps each selected nested serializer (and many-related field) back
+    to the model relation it is sourced from. Relations which are
+    single valued along the whole path are joined via select_related;
+    any path which passes through a to-many relation is prefetched.
+
+    Fields whose source cannot be mapped onto a model relation (e.g.
+    methods or properties) are simply left alone, as are expanded
+    hyperlinks loaded from their own viewset (see 'mark_related_view').
+
+    With prune_columns (see column_pruning_enabled), the planner also
+    restricts (via .only()) the columns loaded for the root model and
+    any select_related models to those backing the selected fields.
+    If any selected field of a model cannot be mapped onto one of its
+    columns (a method, property, SerializerMethodField, dotted source,
+    ...), all columns of that model are loaded, since we cannot know
+    what that field reads. Querysets which already join related
+    models themselves are not pruned.
+    """
+    def __init__(self, serializer, prune_columns=False):
+        self.select_related = []
+        self.prefetch_related = []
+        self.only = []
+        self._prune_columns = prune_columns
+        model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+        if model is not None:
+            self._plan(serializer, model, '', prefetching=False)
+
+    def apply(self, queryset):
+        if not isinstance(queryset, QuerySet) or queryset._fields is not None:
+            # Not a model queryset (e.g. a list, or .values()).
+            return queryset
+        # Pruned before our own joins, which only_columns would
+        # otherwise take for joins of the view (see only_columns).
+        queryset = only_columns(queryset, self.only)
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        existing_prefetches = {
+            getattr(lookup, 'prefetch_to', lookup)
+            for lookup in queryset._prefetch_related_lookups
+        }
+        prefetch_related = [
+            lookup for lookup in self.prefetch_related
+            if lookup not in existing_prefetches
+        ]
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+
+    def _plan(self, serializer, model, prefix, prefetching):
+        # Columns are only pruned for models loaded by the root
+        # queryset itself, not for prefetched ones.
+        prune_columns = self._prune_columns and not prefetching
+        columns = []
+        for field in serializer.fields.values():
+            nested = field.child if isinstance(field, ListSerializer) else field
+            is_nested = hasattr(nested, 'fields')
+            if not (is_nested or isinstance(field, serializers.ManyRelatedField)):
+                column = model_column(model, field.source_attrs)
+                if column is None:
+                    prune_columns = False
+                columns.append(column)
+                continue
+            relation = _relation(model, field.source_attrs)
+            if relation is None:
+                prune_columns = False
+                continue
+            path, related_model, to_many = relation
+            if related_view(nested) is not None:
+                if not to_many:
+                    columns.append(path)
+                continue
+            lookup = prefix + path
+            if prefetching or to_many:
+                self.prefetch_related.append(lookup)
+            else:
+                self.select_related.append(lookup)
+                # The foreign key itself must be loaded to follow it.
+                columns.append(path)
+            if is_nested:
+                self._plan(
+                    nested,
+                    related_model,
+                    lookup + '__',
+                    prefetching=prefetching or to_many,
+                )
+        if prune_columns:
+            self.only.extend(prefix + column for column in columns)
+        elif self._prune_columns and not prefetching:
+            self.only.extend(
+                prefix + f.name for f in model._meta.concrete_fields)
+
+
+def _relation(model, source_attrs):
+    """Map serializer source attributes onto a model relation path.
+
+    Returns a (lookup, related model, to-many) triple, or None if
+    the source is not a chain of model relations.
+    """
+    if not source_attrs:
+        return None
+    to_many = False
+    for attr in source_attrs:
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.is_relation or model_field.related_model is None:
+            return None
+        to_many = to_many or bool(
+            model_field.many_to_many or model_field.one_to_many)
+        model = model_field.related_model
+    return '__'.join(source_attrs), model, to_many
+
+
+def mark_related_view(serializer, view):
+    """Record that serializer expands a hyperlink to view.
+
+    Such serializers are loaded from the related viewset by the
+    RelatedViewLoader rather than joined to the parent queryset.
+    """
+    serializer._graph_wrap_related_view = view
+
+
+def related_view(serializer):
+    """The viewset whose queryset a serializer is loaded from, if any."""
+    return getattr(serializer, '_graph_wrap_related_view', None)
+
+
+def queryset_planning_enabled():
+    return getattr(settings, 'GRAPH_WRAP_QUERYSET_PLANNING', True)
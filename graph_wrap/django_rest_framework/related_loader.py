@@ -0,0 +1,133 @@
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.serializers import ListSerializer
+
+from graph_wrap.shared.column_pruning import column_pruning_enabled
+from .queryset_planner import (
+    QuerysetPlanner,
+    queryset_planning_enabled,
+    related_view,
+)
+
+
+class RelatedViewLoader(object):
+    """Batch loads the expanded HyperlinkedRelatedFields of a serializer.
+
+    When a client selects sub-fields of a HyperlinkedRelatedField,
+    SelectedFieldsSerializer swaps it for the related viewset's
+    serializer. By default the related objects are then read from
+    the parent instances, i.e. joined in by the queryset planner.
+    With this loader, every related pk referenced across the parent
+    instances is gathered, the objects fetched with a single query
+    on the related viewset's own get_queryset() and cached onto the
+    parents, so each expansion costs one query whatever the number
+    of parents, and sees the related viewset's queryset
+    (annotations, select_related, ...).
+
+    Only expansions sourced from a forward foreign key (or one to
+    one) field are batched. Related objects excluded by the related
+    viewset's queryset are left to be read from the parent as before.
+    """
+    def __init__(self, request):
+        self._request = request
+
+    def load(self, serializer, instances):
+        instances = [obj for obj in instances if obj is not None]
+        if not instances or not hasattr(serializer, 'fields'):
+            return
+        for field in serializer.fields.values():
+            nested = field.child if isinstance(field, ListSerializer) else field
+            if not hasattr(nested, 'fields'):
+                continue
+            view = related_view(nested)
+            if view is not None:
+                related = self._load_related(field, nested, view, instances)
+            else:
+                related = _cached_related(field, instances)
+            if related is not None:
+                self.load(nested, related)
+
+    def _load_related(self, field, serializer, view, instances):
+        model = instances[0].__class__
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if not (model_field.many_to_one or model_field.one_to_one) or (
+                not model_field.concrete):
+            return None
+        pks = {
+            getattr(obj, model_field.attname) for obj in instances
+            if not model_field.is_cached(obj)
+        }
+        pks.discard(None)
+        target_field = model_field.target_field
+        if pks:
+            queryset = self._related_queryset(view, serializer).filter(
+                **{'{}__in'.format(target_field.name): pks})
+            related = {
+                getattr(obj, target_field.attname): obj for obj in queryset}
+            for obj in instances:
+                pk = getattr(obj, model_field.attname)
+                if pk in related:
+                    model_field.set_cached_value(obj, related[pk])
+        return [
+            model_field.get_cached_value(obj) for obj in instances
+            if model_field.is_cached(obj)
+        ]
+
+    def _related_queryset(self, view, serializer):
+        related_viewset = view.__class__(
+            request=self._request,
+            args=(),
+            kwargs={},
+            format_kwarg=None,
+            action='list',
+            basename=getattr(view, 'basename', None),
+        )
+        queryset = related_viewset.get_queryset()
+        if queryset_planning_enabled():
+            planner = QuerysetPlanner(
+                serializer, prune_columns=column_pruning_enabled())
+            queryset = planner.apply(queryset)
+        return queryset
+
+
+def _cached_related(field, instances):
+    """The already loaded related objects a nested field serializes.
+
+    Only relations which are cached on the instances (joined or
+    prefetched) are followed, since the serializer must later see
+    the very same related instances.
+    """
+    model = instances[0].__class__
+    try:
+        model_field = model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        return None
+    if not model_field.is_relation:
+        return None
+    related = []
+    for obj in instances:
+        if model_field.many_to_many or model_field.one_to_many:
+            cache_name = model_field.get_cache_name()
+            try:
+                related.extend(
+                    obj._prefetched_objects_cache[cache_name])
+            except (AttributeError, KeyError):
+                return None
+        elif model_field.is_cached(obj):
+            related.append(model_field.get_cached_value(obj))
+        else:
+            return None
+    return related
+
+
+def batch_related_views_enabled():
+    """Whether hyperlinked expansions are loaded with RelatedViewLoader.
+
+    Off by default; set GRAPH_WRAP_BATCH_RELATED_VIEWS to True.
+    """
+    return getattr(settings, 'GRAPH_WRAP_BATCH_RELATED_VIEWS', False)
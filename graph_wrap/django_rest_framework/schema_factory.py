@@ -1,5 +1,7 @@
 from __future__ import unicode_literals
 
+import threading
+
 from rest_framework.filters import SearchFilter
 from rest_framework.schemas.generators import EndpointEnumerator
 from rest_framework.schemas.generators import BaseSchemaGenerator
@@ -7,25 +9,59 @@ import graphene
 from rest_framework import viewsets
 from rest_framework.settings import api_settings
 
+from graph_wrap.shared.schema_cache import timed_phase, urlconf_cache_key
 from graph_wrap.shared.schema_factory import get_query_attributes
 from .query_resolver import (
     AllItemsQueryResolver,
+    PageQueryResolver,
     SingleItemQueryResolver,
 )
-from .api_transformer import ApiTransformer
+from .api_transformer import ApiTransformer, SerializerTypeNames
+from .schema_snapshot import (
+    dump_snapshot_schema,
+    load_snapshot_schema,
+    snapshot_path,
+)
 
 
 class SchemaFactory:
-    def __init__(self, apis):
+    def __init__(self, apis, timings=None):
         self._apis = apis
+        self._timings = timings
 
     @classmethod
-    def create_from_api(cls):
-        views = cls.usable_views()
-        return cls(views).create()
+    def create_from_api(cls, timings=None):
+        path = snapshot_path()
+        if path:
+            with timed_phase(timings, 'load_snapshot'):
+                schema = load_snapshot_schema(path)
+            if schema is not None:
+                return schema
+        with timed_phase(timings, 'usable_views'):
+            views = cls.usable_views()
+        schema = cls(views, timings=timings).create()
+        if path:
+            with timed_phase(timings, 'dump_snapshot'):
+                dump_snapshot_schema(schema, path)
+        return schema
 
     @classmethod
     def usable_views(cls):
+        return list(_usable_views.views())
+
+    @classmethod
+    def usable_view(cls, view_name):
+        """The usable viewset routed under the URL name view_name.
+
+        view_name is a URL name as used by HyperlinkedRelatedField,
+        e.g. 'author-detail' or 'api:author-detail'. Raises KeyError
+        when no usable viewset was registered with that basename.
+        """
+        basename = view_name.split(':')[-1].rsplit('-', 1)[0]
+        return _usable_views.by_basename()[basename]
+
+    @classmethod
+    def _enumerate_usable_views(cls):
         api_endpoints = EndpointEnumerator().get_api_endpoints()
         generator = BaseSchemaGenerator()
         views = []
@@ -47,29 +83,34 @@ class SchemaFactory:
         query_class_attrs = dict()
         type_mapping = dict()
         non_root_types = []
-        seen_nested_serializers = dict()
+        type_names = SerializerTypeNames()
         for api in self._apis:
-            api_transformer = ApiTransformer(
-                api,
-                type_mapping=type_mapping,
-                seen_nested_serializers=seen_nested_serializers,
-            )
-            root_type = api_transformer.root_type()
-            filter_args = self._get_filter_args(api)
-            query_attributes = get_query_attributes(
-                api,
-                api.basename,
-                root_type,
-                SingleItemQueryResolver,
-                AllItemsQueryResolver,
-                **filter_args
-            )
-            query_class_attrs.update(**query_attributes)
-            non_root_types.extend(api_transformer.non_root_types())
+            with timed_phase(self._timings, 'collect_nested_serializers'):
+                api_transformer = ApiTransformer(
+                    api,
+                    type_mapping=type_mapping,
+                    type_names=type_names,
+                )
+            with timed_phase(self._timings, 'build_types'):
+                root_type = api_transformer.root_type()
+                filter_args = self._get_filter_args(api)
+                query_attributes = get_query_attributes(
+                    api,
+                    api.basename,
+                    root_type,
+                    SingleItemQueryResolver,
+                    AllItemsQueryResolver,
+                    PageQueryResolver,
+                    **filter_args
+                )
+                query_class_attrs.update(**query_attributes)
+                non_root_types.extend(api_transformer.non_root_types())
             type_mapping = api_transformer.type_mapping
-            seen_nested_serializers = api_transformer.seen_nested_serializers
-        Query = type(str('Query'), (graphene.ObjectType,), query_class_attrs)
-        schema = graphene.Schema(query=Query, types=non_root_types)
+            type_names = api_transformer.type_names
+        with timed_phase(self._timings, 'build_schema'):
+            Query = type(
+                str('Query'), (graphene.ObjectType,), query_class_attrs)
+            schema = graphene.Schema(query=Query, types=non_root_types)
         return schema
 
     def _get_filter_args(self, api):
@@ -90,3 +131,39 @@ class SchemaFactory:
                         name='orm_filters')
         return filter_args
 
+
+class UsableViews(object):
+    """Index of the usable viewsets routed in the URLconf.
+
+    Enumerating the API endpoints walks the whole URLconf and builds
+    a view instance per endpoint, which is far too slow to do every
+    time a hyperlinked field needs its related viewset (at schema
+    build time, but also while serving requests). The enumeration
+    is instead done once, and indexed by basename, until the URLconf
+    is reloaded (see 'urlconf_cache_key').
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._views = []
+        self._by_basename = dict()
+
+    def views(self):
+        return self._index()[0]
+
+    def by_basename(self):
+        return self._index()[1]
+
+    def _index(self):
+        key = urlconf_cache_key()
+        with self._lock:
+            if self._key != key:
+                self._views = SchemaFactory._enumerate_usable_views()
+                self._by_basename = dict()
+                for view in self._views:
+                    self._by_basename.setdefault(view.basename, view)
+                self._key = key
+            return self._views, self._by_basename
+
+
+_usable_views = UsableViews()
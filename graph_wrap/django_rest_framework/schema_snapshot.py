@@ -0,0 +1,403 @@
+from __future__ import unicode_literals
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import graphene
+import rest_framework
+from django.conf import settings
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils.module_loading import import_string
+from graphene import ObjectType
+from graphene.types.generic import GenericScalar
+from rest_framework import serializers, viewsets
+
+import graph_wrap
+from graph_wrap.shared.query_resolver import JSONResolver
+from graph_wrap.shared.schema_factory import (
+    get_list_endpoint_resolver_name,
+    get_query_attributes,
+)
+from .api_transformer import Dict
+from .query_resolver import (
+    AllItemsQueryResolver,
+    PageQueryResolver,
+    SingleItemQueryResolver,
+)
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+SCALAR_TYPES = {
+    scalar._meta.name: scalar for scalar in (
+        graphene.String,
+        graphene.UUID,
+        graphene.Int,
+        graphene.Float,
+        graphene.Boolean,
+        graphene.Decimal,
+        GenericScalar,
+        Dict,
+    )
+}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class SchemaSnapshot(object):
+    """Serializable description of a built graphene Schema.
+
+    Building the schema requires instantiating every serializer
+    (and its nested serializers) of every viewset found by walking
+    the URLconf. A snapshot records the outcome of that work - the
+    graphene type names chosen for each serializer, the fields of
+    each type and the root Query fields - so that an identical
+    schema can be rebuilt from a file without any serializer
+    introspection.
+
+    A snapshot is only valid for the API it was taken from. It is
+    stored together with a key (see 'api_fingerprint') computed from
+    the registered viewsets and their serializer declarations and
+    is ignored when that key no longer matches.
+    """
+    def __init__(self, key, apis, types, extra_types):
+        self.key = key
+        self._apis = apis
+        self._types = types
+        self._extra_types = extra_types
+
+    @classmethod
+    def from_schema(cls, schema, key):
+        query = schema.get_query_type().graphene_type
+        apis = []
+        types = dict()
+        for field_name in query._meta.fields:
+            resolver = getattr(query, 'resolve_{}'.format(field_name))
+            if not isinstance(resolver, SingleItemQueryResolver):
+                continue
+            api = resolver._api
+            all_items_field = query._meta.fields[
+                get_list_endpoint_resolver_name(field_name)]
+            root_type = query._meta.fields[field_name].type
+            apis.append({
+                'viewset': _dotted_path(api.__class__),
+                'basename': api.basename,
+                'type': root_type._meta.name,
+                'filter_args': list(all_items_field.args),
+            })
+            cls._collect_types(root_type, types)
+        for graphene_type in schema.types or []:
+            cls._collect_types(graphene_type, types)
+        return cls(
+            key,
+            apis,
+            list(types.values()),
+            [t._meta.name for t in schema.types or []],
+        )
+
+    @classmethod
+    def _collect_types(cls, graphene_type, types):
+        name = graphene_type._meta.name
+        if name in types:
+            return
+        fields = []
+        types[name] = {'name': name, 'fields': fields}
+        for field_name, field in graphene_type._meta.fields.items():
+            fields.append({
+                'name': field_name,
+                'type': cls._type_descriptor(field.type, types),
+            })
+
+    @classmethod
+    def _type_descriptor(cls, field_type, types):
+        if isinstance(field_type, graphene.NonNull):
+            return cls._type_descriptor(field_type.of_type, types) + '!'
+        if isinstance(field_type, graphene.List):
+            return '[{}]'.format(
+                cls._type_descriptor(field_type.of_type, types))
+        if issubclass(field_type, ObjectType):
+            cls._collect_types(field_type, types)
+            return field_type._meta.name
+        name = field_type._meta.name
+        if SCALAR_TYPES.get(name) is not field_type:
+            raise SnapshotError(
+                'Scalar type {} cannot be snapshotted'.format(name))
+        return name
+
+    def schema(self):
+        """Rebuild the graphene Schema described by this snapshot."""
+        type_mapping = dict()
+        for type_data in self._types:
+            class_attrs = dict()
+            for field_data in type_data['fields']:
+                field_name = field_data['name']
+                class_attrs[field_name] = self._graphene_field(
+                    field_name, field_data['type'], type_mapping)
+                class_attrs['resolve_{}'.format(field_name)] = (
+                    JSONResolver(field_name))
+            type_mapping[type_data['name']] = type(
+                str(type_data['name']), (ObjectType,), class_attrs)
+
+        query_class_attrs = dict()
+        for api_data in self._apis:
+            api = import_string(api_data['viewset'])(
+                basename=api_data['basename'])
+            filter_args = {
+                name: graphene.String(name=name)
+                for name in api_data['filter_args']
+            }
+            query_class_attrs.update(**get_query_attributes(
+                api,
+                api_data['basename'],
+                type_mapping[api_data['type']],
+                SingleItemQueryResolver,
+                AllItemsQueryResolver,
+                PageQueryResolver,
+                **filter_args
+            ))
+        Query = type(str('Query'), (graphene.ObjectType,), query_class_attrs)
+        return graphene.Schema(
+            query=Query,
+            types=[type_mapping[name] for name in self._extra_types],
+        )
+
+    def _graphene_field(self, field_name, descriptor, type_mapping):
+        # Mirrors the way the FieldTransformers mount their fields,
+        # so e.g. the 'id' field keeps its scalar class (which
+        # get_query_attributes uses for the type of the id argument).
+        required = descriptor.endswith('!')
+        if required:
+            descriptor = descriptor[:-1]
+        field_kwargs = dict(
+            name=field_name,
+            required=required,
+            resolver=JSONResolver(field_name),
+        )
+        if descriptor.startswith('['):
+            return graphene.List(
+                self._graphene_type(descriptor[1:-1], type_mapping),
+                **field_kwargs
+            )
+        if descriptor in SCALAR_TYPES:
+            return SCALAR_TYPES[descriptor](**field_kwargs)
+        return graphene.Field(
+            self._graphene_type(descriptor, type_mapping), **field_kwargs)
+
+    def _graphene_type(self, descriptor, type_mapping):
+        if descriptor.endswith('!'):
+            return graphene.NonNull(
+                self._graphene_type(descriptor[:-1], type_mapping))
+        if descriptor.startswith('['):
+            return graphene.List(
+                self._graphene_type(descriptor[1:-1], type_mapping))
+        if descriptor in SCALAR_TYPES:
+            return SCALAR_TYPES[descriptor]
+        # Needs to be lazy since the type may not yet have been created
+        return lambda: type_mapping[descriptor]
+
+    @classmethod
+    def load(cls, path, key):
+        """Load the snapshot at path, or None if missing or stale."""
+        try:
+            with open(path) as snapshot_file:
+                data = json.load(snapshot_file)
+        except (IOError, ValueError):
+            return None
+        if data.get('version') != SNAPSHOT_VERSION or data.get('key') != key:
+            return None
+        return cls(key, data['apis'], data['types'], data['extra_types'])
+
+    def dump(self, path):
+        """Atomically write the snapshot to path."""
+        data = {
+            'version': SNAPSHOT_VERSION,
+            'key': self.key,
+            'apis': self._apis,
+            'types': self._types,
+            'extra_types': self._extra_types,
+        }
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as snapshot_file:
+                json.dump(data, snapshot_file)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+
+def snapshot_path():
+    return getattr(settings, 'GRAPH_WRAP_SCHEMA_SNAPSHOT', None)
+
+
+def load_snapshot_schema(path):
+    """Build the schema from the snapshot at path, if still valid."""
+    try:
+        snapshot = SchemaSnapshot.load(path, api_fingerprint())
+        return snapshot.schema() if snapshot else None
+    except SnapshotError as error:
+        logger.warning('Not using graph_wrap schema snapshots: %s', error)
+        return None
+    except Exception:
+        # Whatever is wrong with the snapshot, we can always fall
+        # back to building the schema from the API itself.
+        logger.warning(
+            'Ignoring invalid graph_wrap schema snapshot %s', path,
+            exc_info=True)
+        return None
+
+
+def dump_snapshot_schema(schema, path):
+    try:
+        SchemaSnapshot.from_schema(schema, api_fingerprint()).dump(path)
+    except (IOError, OSError, SnapshotError):
+        logger.warning(
+            'Unable to write graph_wrap schema snapshot %s', path,
+            exc_info=True)
+
+
+def api_fingerprint():
+    """Hash of the registered viewsets and their serializer declarations.
+
+    Only the declarations are inspected (declared fields, Meta
+    options and model fields), never serializer instances, so this
+    is cheap compared with building the schema itself. The versions
+    of GraphWrap, DRF and graphene are hashed too. Since the
+    schema is built from the serializers the viewsets return, a
+    SnapshotError is raised for viewsets which override how their
+    serializer is chosen, or serializers which override their fields,
+    as their declarations may not describe the schema.
+    """
+    declarations = [
+        SNAPSHOT_VERSION,
+        graph_wrap.__version__,
+        # The graphene fields of a serializer depend on DRF's field
+        # mapping and on graphene itself.
+        rest_framework.VERSION,
+        graphene.__version__,
+        getattr(settings, 'LIST_ENDPOINT_RESOLVER_PREFIX', None),
+    ]
+    for viewset, basename in registered_viewsets():
+        for hook in ('get_serializer', 'get_serializer_class'):
+            if _overrides(viewset, hook):
+                raise SnapshotError(
+                    '{} overrides {}'.format(_dotted_path(viewset), hook))
+        declarations.append([
+            _dotted_path(viewset),
+            basename,
+            [_dotted_path(backend) for backend in viewset.filter_backends],
+            _serializer_declaration(viewset.serializer_class, set()),
+        ])
+    encoded = json.dumps(declarations, sort_keys=True, default=repr)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def registered_viewsets(patterns=None):
+    """(viewset class, basename) pairs routed in the URLconf.
+
+    A plain walk over the URL patterns, without building view
+    instances as the DRF EndpointEnumerator does.
+    """
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    found = []
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            found.extend(
+                v for v in registered_viewsets(pattern.url_patterns)
+                if v not in found)
+        elif isinstance(pattern, URLPattern):
+            viewset = getattr(pattern.callback, 'cls', None)
+            if viewset is None or not issubclass(
+                    viewset,
+                    (viewsets.ModelViewSet, viewsets.ReadOnlyModelViewSet)):
+                continue
+            basename = pattern.callback.initkwargs.get('basename')
+            if (viewset, basename) not in found:
+                found.append((viewset, basename))
+    return found
+
+
+def _serializer_declaration(serializer_cls, seen):
+    if serializer_cls is None:
+        return None
+    path = _dotted_path(serializer_cls)
+    if serializer_cls in seen:
+        return path
+    seen.add(serializer_cls)
+    if _overrides(serializer_cls, 'get_fields'):
+        raise SnapshotError('{} overrides get_fields'.format(path))
+    meta = getattr(serializer_cls, 'Meta', None)
+    declaration = {
+        'class': path,
+        'meta': {
+            option: _plain(getattr(meta, option), seen)
+            for option in (
+                'fields',
+                'exclude',
+                'depth',
+                'read_only_fields',
+                'extra_kwargs',
+            )
+            if hasattr(meta, option)
+        },
+        'fields': [
+            [name, _field_declaration(field, seen)]
+            for name, field in getattr(
+                serializer_cls, '_declared_fields', {}).items()
+        ],
+    }
+    model = getattr(meta, 'model', None)
+    if model is not None:
+        declaration['model'] = [
+            [f.name, f.__class__.__name__, getattr(f, 'null', None),
+             _dotted_path(f.related_model) if f.related_model else None]
+            for f in model._meta.get_fields()
+        ]
+    return declaration
+
+
+def _field_declaration(field, seen):
+    declaration = {
+        'class': _dotted_path(field.__class__),
+        'kwargs': {
+            key: _plain(value, seen)
+            for key, value in getattr(field, '_kwargs', {}).items()
+        },
+    }
+    if isinstance(field, serializers.BaseSerializer):
+        declaration['serializer'] = _serializer_declaration(
+            field.__class__, seen)
+    return declaration
+
+
+def _plain(value, seen):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [_plain(v, seen) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _plain(v, seen) for k, v in value.items()}
+    if isinstance(value, serializers.Field):
+        return _field_declaration(value, seen)
+    # Avoid repr of e.g. querysets, which would hit the database.
+    return _dotted_path(value.__class__)
+
+
+def _overrides(cls, method_name):
+    """Whether cls has method_name from a class outside of DRF."""
+    for klass in cls.__mro__:
+        if method_name in vars(klass):
+            return not klass.__module__.startswith('rest_framework.')
+    return False
+
+
+def _dotted_path(obj):
+    return '{}.{}'.format(obj.__module__, obj.__qualname__)
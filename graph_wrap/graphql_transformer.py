@@ -1,7 +1,15 @@
 from __future__ import unicode_literals
 
+from collections import ChainMap
+from io import BytesIO
+
 from django.core.handlers.wsgi import WSGIRequest
 
+from graph_wrap.shared.document_cache import (
+    selection_tree_cache,
+    selection_tree_key,
+)
+
 
 def transform_graphql_resolve_info(
         root_field_name, resolve_info, **field_kwargs):
@@ -28,16 +36,25 @@ class GraphQLResolveInfoTransformer(object):
          to the appropriate  GET request for a REST endpoint.
          """
         # TODO: Get correct path info for request
-        environ = self._request.environ
         environ_overrides = dict(
             REQUEST_METHOD='GET',
+            CONTENT_LENGTH='0',
             **environ_params
         )
+        environ_overrides['wsgi.input'] = BytesIO()
         if 'orm_filters' in self._field_kwargs:
             query_string = self._field_kwargs['orm_filters']
             environ_overrides['QUERY_STRING'] = query_string
-        environ.update(environ_overrides)
-        get_request = WSGIRequest(environ)
+        # The sub-request's environ is a copy-on-write overlay of the
+        # original one, which is shared by, but never written to by,
+        # the sub-requests of all root fields (which may therefore
+        # be dispatched concurrently).
+        get_request = WSGIRequest(
+            ChainMap(environ_overrides, self._request.environ))
+        if 'QUERY_STRING' not in environ_overrides:
+            # The same query string: no need to parse it again.
+            get_request.GET = self._request.GET
+        get_request.COOKIES = self._request.COOKIES
         get_request.user = self._request.user
         get_request.content_type = self._request.content_type
         try:
@@ -88,14 +105,53 @@ class GraphQLResolveInfoTransformer(object):
             u'id': {}},
             }
         """
+        cache_key = self._selection_cache_key()
+        if cache_key is not None:
+            selected_fields = selection_tree_cache().get(cache_key)
+            if selected_fields is not None:
+                return selected_fields
         field = next(
             field for field in self._resolve_info.field_asts if
             field.name.value == self._root_field_name
         )
-        selected_fields = self._get_selected_fields(
-            field, {})
+        selected_fields = SelectionTreeBuilder(
+            self._resolve_info.fragments).build(field)
+        if cache_key is not None:
+            selection_tree_cache().set(cache_key, selected_fields)
         return selected_fields
 
+    def _selection_cache_key(self):
+        """Key of the resolved root field in selection_tree_cache.
+
+        Returns None when the source of the document is not known.
+        """
+        operation = self._resolve_info.operation
+        source = getattr(operation.loc, 'source', None)
+        body = getattr(source, 'body', None)
+        if body is None:
+            return None
+        return selection_tree_key(
+            body, operation, self._resolve_info.field_asts[0])
+
+
+class TransformationError(Exception):
+    pass
+
+
+class SelectionTreeBuilder(object):
+    """Builds the selected fields tree of a field AST.
+
+    See GraphQLResolveInfoTransformer.transform_resolve_info for the
+    format of the tree. Only needs the fragment definitions of the
+    document, so trees can also be built ahead of execution (see
+    graph_wrap.shared.persisted_queries).
+    """
+    def __init__(self, fragments):
+        self._fragments = fragments
+
+    def build(self, field):
+        return self._get_selected_fields(field, {})
+
     def _get_selected_fields(self, field, selected_fields):
         if hasattr(field.selection_set, 'selections'):
             selections_for_field = field.selection_set.selections
@@ -121,10 +177,6 @@ class GraphQLResolveInfoTransformer(object):
 
     def _get_fragment(self, field):
         try:
-            return self._resolve_info.fragments[field.name.value]
+            return self._fragments[field.name.value]
         except KeyError:
             raise TransformationError('Unable to transform!')
-
-
-class TransformationError(Exception):
-    pass
@@ -0,0 +1,171 @@
+from __future__ import unicode_literals
+
+import json
+from abc import abstractmethod
+from collections import OrderedDict
+
+from django.conf import settings
+from promise import Promise
+from promise.dataloader import DataLoader
+
+from graph_wrap.graphql_transformer import GraphQLResolveInfoTransformer
+from .instrumentation import traced_phase
+
+
+class BatchedSingleItemResolverMixin(object):
+    """Batches the sibling lookups of a SingleItemQueryResolver.
+
+    Backends dispatch the batch when rest_api_resolver_method is
+    called with a 'batch_pks' list (rather than an 'id'), and map
+    the data of that response back onto the ids in '_batch_items'.
+    A backend returns False from '_batchable' for APIs whose lookup
+    of a single item the batch would not reproduce.
+    """
+    def __call__(self, root, info, **kwargs):
+        if not self.batches_lookups():
+            return self.resolve_single(info, **kwargs)
+        loader = batch_loader(info.context, self)
+        return loader.load_item(info, kwargs['id'])
+
+    def dispatches_on_call(self):
+        return not self.batches_lookups()
+
+    def batches_lookups(self):
+        return batch_lookups_enabled() and self._batchable()
+
+    def _batchable(self):
+        return True
+
+    def resolve_single(self, info, **kwargs):
+        return super(BatchedSingleItemResolverMixin, self).__call__(
+            None, info, **kwargs)
+
+    def resolve_batch(self, info, item_ids):
+        """Retrieve the items with item_ids using one REST dispatch.
+
+        Returns the data of each item retrieved, keyed by str(id).
+        For resources in the result cache, each item is cached under
+        the key of its lone lookup (see '_cached_dispatch'), so only
+        the items missing from the cache are dispatched.
+        """
+        cache, timeout = self._result_cache()
+        if cache is None:
+            return self._dispatch_batch(info, item_ids)
+        keys = OrderedDict(
+            (str(item_id), cache.key(
+                info.context, self, self._dispatch_key(info, id=item_id)))
+            for item_id in item_ids
+        )
+        items = dict()
+        for item_id, key in keys.items():
+            data = cache.get(key)
+            if data is not None:
+                items[item_id] = data
+        missing_ids = [
+            item_id for item_id in item_ids if str(item_id) not in items]
+        if missing_ids:
+            dispatched = self._dispatch_batch(info, missing_ids)
+            for item_id, data in dispatched.items():
+                cache.set(keys[item_id], data, timeout)
+            items.update(dispatched)
+        return items
+
+    def _dispatch_batch(self, info, item_ids):
+        request = self._transform_request(info)
+        with traced_phase(self._field_name, 'dispatch'):
+            response = self._get_response(request, batch_pks=item_ids)
+        if response.status_code >= 400:
+            # Leave it to the detail dispatches to report the error.
+            return dict()
+        with traced_phase(self._field_name, 'render'):
+            response = self._render(response)
+        with traced_phase(self._field_name, 'decode'):
+            data = self._response_data(response)
+        return self._batch_items(data, item_ids)
+
+    @abstractmethod
+    def _batch_items(self, data, item_ids):
+        """The data of each item in data, keyed by str(id)."""
+        pass
+
+
+class SingleItemBatchLoader(DataLoader):
+    """DataLoader batching the single item lookups of one root field.
+
+    A document such as
+
+        query {
+            a: post(id: 1) { content }
+            b: post(id: 2) { content }
+        }
+
+    resolves the 'post' root field once per alias. Each resolution
+    only queues its id here; once graphql has queued every sibling,
+    the ids sharing the same field selection are retrieved with a
+    single REST dispatch (see 'resolve_batch' on the resolver), i.e.
+    one 'pk__in' fetch rather than one detail view per alias.
+
+    Ids the batched dispatch did not return (not found, not
+    permitted, ...), and lone lookups, are resolved through the usual
+    detail dispatch, so they keep its exact behaviour and errors.
+    One loader is created per resolver per GraphQL request (see
+    'batch_loader').
+    """
+    def __init__(self, resolver):
+        super(SingleItemBatchLoader, self).__init__()
+        self._resolver = resolver
+        self._infos = dict()
+
+    def load_item(self, info, item_id):
+        selected_fields = GraphQLResolveInfoTransformer(
+            self._resolver._field_name, info).transform_resolve_info()
+        selection_key = json.dumps(selected_fields, sort_keys=True)
+        self._infos.setdefault(selection_key, info)
+        return self.load((selection_key, item_id))
+
+    def batch_load_fn(self, keys):
+        ids_by_selection = OrderedDict()
+        for selection_key, item_id in keys:
+            ids_by_selection.setdefault(selection_key, []).append(item_id)
+        results = dict()
+        for selection_key, item_ids in ids_by_selection.items():
+            info = self._infos[selection_key]
+            items = dict()
+            if len(item_ids) > 1:
+                items = self._resolver.resolve_batch(info, item_ids)
+            for item_id in item_ids:
+                key = (selection_key, item_id)
+                try:
+                    results[key] = items[str(item_id)]
+                except KeyError:
+                    results[key] = self._resolve_single(info, item_id)
+        return Promise.resolve([results[key] for key in keys])
+
+    def _resolve_single(self, info, item_id):
+        try:
+            return self._resolver.resolve_single(info, id=item_id)
+        except Exception as e:
+            # Rejects the lookup with the error, as graphql would
+            # for the unbatched resolver.
+            return e
+
+
+def batch_loader(request, resolver):
+    """The SingleItemBatchLoader of resolver for this GraphQL request."""
+    try:
+        loaders = request._graph_wrap_batch_loaders
+    except AttributeError:
+        loaders = request._graph_wrap_batch_loaders = dict()
+    try:
+        return loaders[resolver]
+    except KeyError:
+        return loaders.setdefault(resolver, SingleItemBatchLoader(resolver))
+
+
+def batch_lookups_enabled():
+    """Whether sibling single item lookups are batched.
+
+    On by default; set GRAPH_WRAP_BATCH_LOOKUPS to False to dispatch
+    every single item root field separately.
+    """
+    return getattr(settings, 'GRAPH_WRAP_BATCH_LOOKUPS', True)
@@ -0,0 +1,57 @@
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet
+
+
+def column_pruning_enabled():
+    """Whether to load only the columns backing the selected fields.
+
+    Off by default: when the GRAPH_WRAP_COLUMN_PRUNING setting is
+    True, querysets of the REST views are restricted (via .only())
+    to the columns needed for the fields selected in the GraphQL
+    query. Fields which cannot be mapped onto a column (methods,
+    properties, custom dehydration, ...) disable the pruning of their
+    model, so this is safe, but any code reading other attributes of
+    the model instances (e.g. in a custom permission check) would
+    trigger an extra query per instance.
+    """
+    return getattr(settings, 'GRAPH_WRAP_COLUMN_PRUNING', False)
+
+
+def model_column(model, source_attrs):
+    """Name of the model field backing a (non-nested) API field.
+
+    source_attrs is the list of attributes the field reads from the
+    instance. Returns None unless that is a single model field we can
+    load via .only(). Fields loaded separately from the instance row
+    (many-to-many and reverse foreign keys) only need its primary key.
+    """
+    if len(source_attrs) != 1:
+        return None
+    try:
+        model_field = model._meta.get_field(source_attrs[0])
+    except FieldDoesNotExist:
+        return None
+    if model_field.concrete:
+        return model_field.name
+    if model_field.many_to_many or model_field.one_to_many:
+        return model._meta.pk.name
+    return None
+
+
+def only_columns(queryset, columns):
+    """Restrict queryset to columns, unless it already defers fields.
+
+    Nor are querysets which already select_related other models
+    restricted, since their joins would need the columns of the
+    related models too (and .only() cannot defer a joined relation).
+    """
+    if (not columns
+            or not isinstance(queryset, QuerySet)
+            or queryset._fields is not None
+            or queryset.query.select_related
+            or queryset.query.deferred_loading != (frozenset(), True)):
+        return queryset
+    return queryset.only(*columns)
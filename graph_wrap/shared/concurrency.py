@@ -0,0 +1,110 @@
+from __future__ import unicode_literals
+
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import close_old_connections
+from graphql.execution.executors.utils import process
+from promise import Promise
+
+from .query_resolver import QueryResolverBase
+
+
+class ConcurrentRootFieldExecutor(object):
+    """graphql-core executor resolving root fields concurrently.
+
+    graphql-core resolves the root fields of a query one after the
+    other, so a query with several independent root fields takes
+    the sum of their REST dispatches. With this executor, the root
+    fields resolved by a QueryResolverBase are dispatched in a
+    thread pool shared by the process (of GRAPH_WRAP_ROOT_FIELD_THREADS
+    threads), at most 'concurrency' of them at a time for a given
+    request, so the query takes about as long as its slowest field.
+    Any other field is resolved in the request's thread, as usual.
+
+    One executor is used per GraphQL request, see GraphWrapGraphQLView.
+    """
+    def __init__(self, concurrency):
+        self._concurrency = concurrency
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._running = 0
+        self._futures = []
+
+    def execute(self, fn, *args, **kwargs):
+        if not _dispatches_root_field(args[1]):
+            return fn(*args, **kwargs)
+        promise = Promise()
+        with self._lock:
+            self._pending.append((promise, fn, args, kwargs))
+        self._submit_pending()
+        return promise
+
+    def wait_until_finished(self):
+        while True:
+            with self._lock:
+                futures, self._futures = self._futures, []
+            if not futures:
+                return
+            wait(futures)
+
+    def clean(self):
+        with self._lock:
+            self._futures = []
+
+    def _submit_pending(self):
+        with self._lock:
+            while self._pending and self._running < self._concurrency:
+                task = self._pending.popleft()
+                self._running += 1
+                self._futures.append(root_field_pool().submit(
+                    self._run, *task))
+
+    def _run(self, promise, fn, args, kwargs):
+        try:
+            process(promise, fn, args, kwargs)
+        finally:
+            # As at the end of a request: the thread's connections are
+            # kept for the next root fields it resolves, unless over
+            # CONN_MAX_AGE (or unusable).
+            close_old_connections()
+            with self._lock:
+                self._running -= 1
+            self._submit_pending()
+
+
+def _dispatches_root_field(info):
+    resolver = info.parent_type.fields[info.field_name].resolver
+    return (
+        info.parent_type is info.schema.get_query_type() and
+        isinstance(resolver, QueryResolverBase) and
+        resolver.dispatches_on_call()
+    )
+
+
+def concurrent_root_fields():
+    """Number of root fields of a request resolved concurrently.
+
+    Set by GRAPH_WRAP_CONCURRENT_ROOT_FIELDS; the default of 1
+    resolves root fields one after the other.
+    """
+    return getattr(settings, 'GRAPH_WRAP_CONCURRENT_ROOT_FIELDS', 1)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def root_field_pool():
+    """The thread pool in which root fields are dispatched concurrently."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=getattr(
+                    settings, 'GRAPH_WRAP_ROOT_FIELD_THREADS', 8),
+                thread_name_prefix='graph_wrap',
+            )
+        return _pool
@@ -0,0 +1,189 @@
+from __future__ import unicode_literals
+
+import itertools
+import threading
+import weakref
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from graphql.backend.core import GraphQLCoreBackend
+from graphql.execution import ExecutionResult, execute
+from graphql.validation import validate
+from six import string_types
+
+
+class LRUCache(object):
+    """Thread-safe mapping keeping the maxsize most recently used items.
+
+    A maxsize of 0 disables caching altogether. Pinned items are kept
+    apart from the LRU items and never evicted.
+    """
+    def __init__(self, maxsize):
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self._pinned = dict()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                return self._pinned[key]
+            except KeyError:
+                pass
+            try:
+                self._items.move_to_end(key)
+            except KeyError:
+                return None
+            return self._items[key]
+
+    def set(self, key, value):
+        if not self._maxsize:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self._maxsize:
+                self._items.popitem(last=False)
+
+    def pin(self, key, value):
+        with self._lock:
+            self._pinned[key] = value
+            self._items.pop(key, None)
+
+    def unpin(self, key):
+        with self._lock:
+            self._pinned.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class CachingBackend(GraphQLCoreBackend):
+    """graphql-core backend reusing parsed and validated documents.
+
+    The default backend parses the query string into an AST on every
+    request and validates that AST against the schema every time it
+    is executed. Both only depend on the schema and the query string,
+    so for the (typically few) distinct query strings a client sends
+    we keep the resulting document, validation errors included, in
+    an LRU cache.
+
+    The documents are keyed by a generation number of their schema
+    rather than by the schema itself, and the cache is cleared when
+    a schema is invalidated (see SchemaCache), so replaced schemas
+    are not kept alive by the cache.
+    """
+    def __init__(self, maxsize, executor=None):
+        super(CachingBackend, self).__init__(executor=executor)
+        self._documents = LRUCache(maxsize)
+        self._generations = weakref.WeakKeyDictionary()
+        self._next_generation = itertools.count(1)
+        self._generations_lock = threading.Lock()
+
+    def document_from_string(self, schema, document_string):
+        if not isinstance(document_string, string_types):
+            return super(CachingBackend, self).document_from_string(
+                schema, document_string)
+        key = self._key(schema, document_string)
+        document = self._documents.get(key)
+        if document is None:
+            document = self._validated_document(schema, document_string)
+            self._documents.set(key, document)
+        return document
+
+    def pin(self, schema, document_string):
+        """Parse and validate a document, and keep it until unpinned."""
+        document = self._validated_document(schema, document_string)
+        self._documents.pin(self._key(schema, document_string), document)
+        return document
+
+    def unpin(self, schema, document_string):
+        self._documents.unpin(self._key(schema, document_string))
+
+    def clear(self):
+        self._documents.clear()
+
+    def _key(self, schema, document_string):
+        with self._generations_lock:
+            try:
+                generation = self._generations[schema]
+            except KeyError:
+                generation = self._generations[schema] = next(
+                    self._next_generation)
+        return generation, document_string
+
+    def _validated_document(self, schema, document_string):
+        document = super(CachingBackend, self).document_from_string(
+            schema, document_string)
+        document.validation_errors = validate(schema, document.document_ast)
+        document.execute = partial(
+            _execute_validated,
+            schema,
+            document.document_ast,
+            document.validation_errors,
+            **self.execute_params
+        )
+        return document
+
+
+def _execute_validated(
+        schema, document_ast, validation_errors, *args, **kwargs):
+    if validation_errors:
+        return ExecutionResult(errors=validation_errors, invalid=True)
+    kwargs.pop('validate', None)
+    return execute(schema, document_ast, *args, **kwargs)
+
+
+def selection_tree_key(document_string, operation, field_ast):
+    """Key of the selection tree of a root field in selection_tree_cache.
+
+    The selected fields only depend on the document, the operation
+    executed and the root field (identified by its response key too,
+    since aliases of the same field may select different sub-fields).
+    """
+    return (
+        document_string,
+        operation.name.value if operation.name else None,
+        field_ast.name.value,
+        (field_ast.alias or field_ast.name).value,
+    )
+
+
+def document_cache_size():
+    """Number of documents (and of selection trees) cached.
+
+    Set by GRAPH_WRAP_DOCUMENT_CACHE_SIZE, 0 disabling the caches.
+    """
+    return getattr(settings, 'GRAPH_WRAP_DOCUMENT_CACHE_SIZE', 1000)
+
+
+_backend = None
+_selection_trees = None
+_lock = threading.Lock()
+
+
+def document_backend():
+    """The CachingBackend shared by the graph_wrap views."""
+    global _backend
+    with _lock:
+        if _backend is None:
+            _backend = CachingBackend(document_cache_size())
+        return _backend
+
+
+def selection_tree_cache():
+    """LRU cache of the selected fields trees of root fields.
+
+    Keyed by selection_tree_key; see
+    GraphQLResolveInfoTransformer.transform_resolve_info.
+    """
+    global _selection_trees
+    with _lock:
+        if _selection_trees is None:
+            _selection_trees = LRUCache(document_cache_size())
+        return _selection_trees
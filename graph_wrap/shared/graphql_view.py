@@ -0,0 +1,197 @@
+from __future__ import unicode_literals
+
+import json
+
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    StreamingHttpResponse,
+)
+from graphene_django.debug.middleware import DjangoDebugMiddleware
+from graphene_django.views import GraphQLView, HttpError
+from graphql.execution import ExecutionResult
+
+from .concurrency import ConcurrentRootFieldExecutor, concurrent_root_fields
+from .document_cache import document_backend
+from .persisted_queries import (
+    persisted_queries_only,
+    persisted_query_store,
+    query_id,
+)
+from .query_cost import check_query_limits
+from .streaming import (
+    ListStream,
+    streaming_chunk_size,
+    streaming_lists_enabled,
+)
+
+
+class PersistedQueryError(HttpError):
+    """HttpError about a persisted query, reported with a stable code."""
+    def __init__(self, response, message, code):
+        super(PersistedQueryError, self).__init__(response, message)
+        self.code = code
+
+
+class GraphWrapGraphQLView(GraphQLView):
+    """The graphene-django GraphQLView serving the graph_wrap schemas.
+
+    Documents are parsed and validated through the caching backend
+    (see 'document_backend'). When a persisted query store is
+    configured (GRAPH_WRAP_PERSISTED_QUERIES), clients may send the
+    id of a stored query instead of the query itself, either as the
+    'id' parameter or as an Apollo style persisted query extension:
+
+        {"extensions": {"persistedQuery": {"sha256Hash": "<id>"}}}
+
+    With GRAPH_WRAP_PERSISTED_QUERIES_ONLY, any other query is
+    refused.
+
+    With GRAPH_WRAP_STREAMING_LISTS, queries selecting a single list
+    field are streamed (see ListStream). With
+    GRAPH_WRAP_CONCURRENT_ROOT_FIELDS above 1, root fields are
+    resolved concurrently (see ConcurrentRootFieldExecutor). Queries
+    over the GRAPH_WRAP_QUERY_LIMITS are rejected before execution
+    (see check_query_limits).
+    """
+    def dispatch(self, request, *args, **kwargs):
+        if streaming_lists_enabled():
+            response = self._streaming_response(request)
+            if response is not None:
+                return response
+        return super(GraphWrapGraphQLView, self).dispatch(
+            request, *args, **kwargs)
+
+    def get_backend(self, request):
+        return document_backend()
+
+    @staticmethod
+    def format_error(error):
+        formatted = GraphQLView.format_error(error)
+        if isinstance(error, PersistedQueryError):
+            formatted['extensions'] = {'code': error.code}
+        return formatted
+
+    def execute_graphql_request(
+            self, request, data, query, variables, operation_name,
+            *args, **kwargs):
+        errors = self._query_limit_errors(
+            request, query, variables, operation_name)
+        if errors:
+            return ExecutionResult(errors=errors, invalid=True)
+        concurrency = concurrent_root_fields()
+        if self.executor is None and concurrency > 1:
+            self.executor = ConcurrentRootFieldExecutor(concurrency)
+        return super(GraphWrapGraphQLView, self).execute_graphql_request(
+            request, data, query, variables, operation_name,
+            *args, **kwargs)
+
+    def get_graphql_params(self, request, data):
+        query, variables, operation_name, id = super(
+            GraphWrapGraphQLView, self).get_graphql_params(request, data)
+        store = persisted_query_store()
+        if store is None:
+            return query, variables, operation_name, id
+        id = id or _persisted_query_hash(request, data)
+        if id and not query:
+            query = store.get(id)
+            if query is None:
+                # As served by Apollo, for clients to retry with the
+                # full query.
+                raise PersistedQueryError(
+                    HttpResponse(),
+                    'PersistedQueryNotFound',
+                    'PERSISTED_QUERY_NOT_FOUND',
+                )
+        elif query and persisted_queries_only():
+            if store.get(query_id(query)) is None:
+                raise PersistedQueryError(
+                    HttpResponseForbidden(),
+                    'PersistedQueryNotAllowed',
+                    'PERSISTED_QUERY_NOT_ALLOWED',
+                )
+        store.compile(self.schema)
+        return query, variables, operation_name, id
+
+    def _streaming_response(self, request):
+        """The streamed response to request, if it can be streamed.
+
+        Anything out of the ordinary (a batch, GraphiQL, middleware,
+        an invalid document, ...) is left to the usual execution.
+        """
+        if self.batch or request.method.lower() not in ('get', 'post'):
+            return None
+        try:
+            data = self.parse_body(request)
+            if self.graphiql and self.can_display_graphiql(request, data):
+                return None
+            query, variables, operation_name, id = self.get_graphql_params(
+                request, data)
+        except HttpError:
+            return None
+        if not query or _has_middleware(self.get_middleware(request)):
+            return None
+        try:
+            document = self.get_backend(request).document_from_string(
+                self.schema, query)
+        except Exception:
+            return None
+        if getattr(document, 'validation_errors', True):
+            return None
+        if check_query_limits(
+                self.schema, document.document_ast, operation_name,
+                variables):
+            return None
+        stream = ListStream.plan(
+            self.schema,
+            document.document_ast,
+            operation_name,
+            variables,
+            self.get_context(request),
+            self.get_root_value(request),
+            streaming_chunk_size(),
+        )
+        if stream is None:
+            return None
+        return StreamingHttpResponse(
+            stream.json_chunks(), content_type='application/json')
+
+    def _query_limit_errors(self, request, query, variables, operation_name):
+        """Errors for a query over the limits (see check_query_limits).
+
+        Checked before execution, so before any REST dispatch.
+        Invalid documents are left to the usual execution to report.
+        """
+        if not query:
+            return []
+        try:
+            document = self.get_backend(request).document_from_string(
+                self.schema, query)
+        except Exception:
+            return []
+        if getattr(document, 'validation_errors', None):
+            return []
+        return check_query_limits(
+            self.schema, document.document_ast, operation_name, variables)
+
+
+def _has_middleware(middleware):
+    # DjangoDebugMiddleware (added when DEBUG is on) only reports
+    # through a '_debug' root field, so never concerns a streamed list.
+    return any(
+        not isinstance(m, DjangoDebugMiddleware) for m in middleware or ())
+
+
+def _persisted_query_hash(request, data):
+    extensions = request.GET.get('extensions') or data.get('extensions')
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            raise HttpError(
+                HttpResponseBadRequest(), 'Extensions are invalid JSON.')
+    try:
+        return extensions['persistedQuery']['sha256Hash']
+    except (KeyError, TypeError):
+        return None
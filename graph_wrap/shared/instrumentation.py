@@ -0,0 +1,103 @@
+from __future__ import unicode_literals
+
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+PHASES = ('select', 'request', 'dispatch', 'render', 'decode')
+
+
+class PhaseEvent(object):
+    """A phase of the resolution of a root field, as seen by a tracer.
+
+    The phases of QueryResolverBase are, in order: 'select' (the
+    selected fields tree), 'request' (the construction of the REST
+    sub-request), 'dispatch' (the REST view), 'render' (rendering the
+    response to JSON) and 'decode' (parsing the JSON back). Once the
+    phase is over, 'duration' holds its duration, and 'queries' and
+    'query_duration' the number and total duration of the SQL queries
+    it ran (durations in seconds).
+    """
+    def __init__(self, field_name, phase):
+        self.field_name = field_name
+        self.phase = phase
+        self.duration = None
+        self.queries = None
+        self.query_duration = None
+
+
+class QueryCounter(object):
+    """connection.execute_wrapper counting queries and their duration."""
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.duration += time.perf_counter() - start
+
+
+@contextmanager
+def traced_phase(field_name, phase):
+    """Report the with-block as a phase of field_name to the tracer.
+
+    The tracer is configured by the GRAPH_WRAP_TRACER setting, the
+    dotted path to a class (instantiated once) or object with a
+    'trace' method taking a PhaseEvent and returning a context
+    manager around the phase. The event is complete by the time
+    that context manager exits, so an APM integration can be
+
+        class Tracer(object):
+            @contextmanager
+            def trace(self, event):
+                with apm.start_span('graph_wrap.' + event.phase) as span:
+                    yield
+                    span.set_tag('field', event.field_name)
+                    span.set_tag('sql.queries', event.queries)
+
+    Without a tracer, the phase is not instrumented at all.
+    """
+    active_tracer = tracer()
+    if active_tracer is None:
+        yield
+        return
+    event = PhaseEvent(field_name, phase)
+    with active_tracer.trace(event):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(counter))
+                yield
+        finally:
+            event.duration = time.perf_counter() - start
+            event.queries = counter.queries
+            event.query_duration = counter.duration
+
+
+_tracers = dict()
+_tracers_lock = threading.Lock()
+
+
+def tracer():
+    """The tracer configured by GRAPH_WRAP_TRACER, if any."""
+    path = getattr(settings, 'GRAPH_WRAP_TRACER', None)
+    if not path:
+        return None
+    with _tracers_lock:
+        try:
+            return _tracers[path]
+        except KeyError:
+            tracer_cls = import_string(path)
+            tracer_ = tracer_cls() if isinstance(tracer_cls, type) else (
+                tracer_cls)
+            return _tracers.setdefault(path, tracer_)
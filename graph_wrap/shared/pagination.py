@@ -0,0 +1,136 @@
+from __future__ import unicode_literals
+
+import base64
+from abc import abstractmethod
+
+import graphene
+from six.moves.urllib.parse import parse_qsl, urlsplit
+
+PAGE_ARGUMENTS = ('first', 'after', 'limit', 'offset')
+
+
+class PaginationError(Exception):
+    pass
+
+
+class PageInfo(graphene.ObjectType):
+    """Page info of a connection-style '<type>_page' type.
+
+    Cursors are opaque to clients: pass end_cursor as the 'after'
+    argument to fetch the next page (and start_cursor to go back).
+    total_count is only known for paginators which count the results.
+    """
+    has_next_page = graphene.Boolean(required=True, name='has_next_page')
+    has_previous_page = graphene.Boolean(required=True, name='has_previous_page')
+    start_cursor = graphene.String(name='start_cursor')
+    end_cursor = graphene.String(name='end_cursor')
+    total_count = graphene.Int(name='total_count')
+
+    class Meta:
+        name = 'page_info'
+
+
+def page_type(graphene_type):
+    """Connection-style type for a page of graphene_type items."""
+    return type(
+        str('{}_page'.format(graphene_type._meta.name)),
+        (graphene.ObjectType,),
+        dict(
+            items=graphene.List(graphene_type, required=True, name='items'),
+            page_info=graphene.Field(
+                PageInfo, required=True, name='page_info'),
+        ),
+    )
+
+
+def page_arguments():
+    return dict(
+        first=graphene.Int(name='first'),
+        after=graphene.String(name='after'),
+        limit=graphene.Int(name='limit'),
+        offset=graphene.Int(name='offset'),
+    )
+
+
+class PageQueryResolverMixin(object):
+    """Resolves an 'all_<items>_page' field on the root Query.
+
+    Dispatches to the list endpoint, like the AllItemsQueryResolver,
+    with the pagination arguments mapped onto the query parameters
+    of the endpoint's paginator. A cursor is the (encoded) query
+    string of the paginator's own next or previous page link, so
+    whatever scheme the paginator uses (page numbers, limit/offset,
+    DRF's CursorPagination) it is simply handed back to it.
+
+    Backends provide '_pagination_params', mapping the page size and
+    offset onto query parameters, and '_page', which extracts the
+    items, next and previous links and total count from the data of
+    the list response.
+    """
+    def __call__(self, root, info, **kwargs):
+        data = super(PageQueryResolverMixin, self).__call__(
+            root, info, **kwargs)
+        items, next_url, previous_url, total_count = self._page(data)
+        return dict(
+            items=items,
+            page_info=dict(
+                has_next_page=next_url is not None,
+                has_previous_page=previous_url is not None,
+                start_cursor=encode_cursor(previous_url),
+                end_cursor=encode_cursor(next_url),
+                total_count=total_count,
+            ),
+        )
+
+    def _transform_request(self, info, **kwargs):
+        first = kwargs.pop('first', None)
+        after = kwargs.pop('after', None)
+        limit = kwargs.pop('limit', None)
+        offset = kwargs.pop('offset', None)
+        if first is not None and limit is not None and first != limit:
+            raise PaginationError('Only one of first and limit may be given.')
+        size = first if first is not None else limit
+        # Paginators treat a page size they cannot use as their
+        # default, which may well be no pagination at all.
+        if size is not None and size < 1:
+            raise PaginationError('first and limit must be at least 1.')
+        if offset is not None and offset < 0:
+            raise PaginationError('offset must not be negative.')
+        request = super(PageQueryResolverMixin, self)._transform_request(
+            info, **kwargs)
+        params = decode_cursor(after) if after else dict()
+        params.update(self._pagination_params(size, offset))
+        if params:
+            query = request.GET.copy()
+            for name, value in params.items():
+                query[name] = value
+            request.GET = query
+        return request
+
+    def _selected_fields(self, selected_fields):
+        return selected_fields.get('items', {})
+
+    @abstractmethod
+    def _pagination_params(self, size, offset):
+        """Query parameters requesting size items from offset."""
+        pass
+
+    @abstractmethod
+    def _page(self, data):
+        """The (items, next url, previous url, total count) of data."""
+        pass
+
+
+def encode_cursor(url):
+    if url is None:
+        return None
+    query = urlsplit(url).query
+    return base64.urlsafe_b64encode(query.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        query = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+    except (TypeError, ValueError):
+        raise PaginationError('Invalid cursor.')
+    return dict(parse_qsl(query, keep_blank_values=True))
@@ -0,0 +1,164 @@
+from __future__ import unicode_literals
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from graphql.language import ast
+
+from graph_wrap.graphql_transformer import SelectionTreeBuilder
+from .document_cache import (
+    document_backend,
+    selection_tree_cache,
+    selection_tree_key,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PersistedQueryStore(object):
+    """File-backed store of persisted GraphQL queries.
+
+    The file is a JSON object mapping the id of each query (the
+    sha256 hex digest of the query string, see 'query_id') to the
+    query string. Clients then send the id instead of the query.
+
+    Everything which only depends on a stored query is computed once
+    per schema, when the first persisted query is requested (see
+    'compile'): the parsed and validated document is pinned in the
+    document backend cache, and the selected fields tree of each of
+    its root fields in the selection tree cache. (The REST views used
+    to resolve the root fields are built once per schema anyway.)
+    """
+    def __init__(self, path):
+        self._path = path
+        self._lock = threading.Lock()
+        self._queries = None
+        self._compiled = (None, None, ())
+
+    def get(self, query_id):
+        return self.queries().get(query_id)
+
+    def queries(self):
+        queries = self._queries
+        if queries is None:
+            with self._lock:
+                if self._queries is None:
+                    self._queries = self._load()
+                queries = self._queries
+        return queries
+
+    def add(self, query):
+        """Persist query to the file, returning its id."""
+        with self._lock:
+            queries = dict(self._queries or self._load())
+            queries[query_id(query)] = query
+            self._dump(queries)
+            self._queries = queries
+        return query_id(query)
+
+    def compile(self, schema):
+        """Precompute the documents of the stored queries for schema."""
+        queries = self.queries()
+        if self._is_compiled(schema, queries):
+            return
+        with self._lock:
+            if self._is_compiled(schema, queries):
+                return
+            compiled_schema, compiled_queries, tree_keys = self._compiled
+            backend = document_backend()
+            trees = selection_tree_cache()
+            if compiled_schema is not None:
+                for query in compiled_queries.values():
+                    backend.unpin(compiled_schema, query)
+            for key in tree_keys:
+                trees.unpin(key)
+            tree_keys = []
+            for query in queries.values():
+                document = backend.pin(schema, query)
+                if document.validation_errors:
+                    continue
+                for key, tree in _selection_trees(document):
+                    trees.pin(key, tree)
+                    tree_keys.append(key)
+            self._compiled = (schema, queries, tree_keys)
+
+    def _is_compiled(self, schema, queries):
+        compiled_schema, compiled_queries, _ = self._compiled
+        return compiled_schema is schema and compiled_queries is queries
+
+    def _load(self):
+        try:
+            with open(self._path) as queries_file:
+                return json.load(queries_file)
+        except IOError:
+            return dict()
+        except ValueError:
+            # Serving no persisted queries beats failing every request.
+            logger.error(
+                'Ignoring invalid graph_wrap persisted queries file %s',
+                self._path, exc_info=True)
+            return dict()
+
+    def _dump(self, queries):
+        directory = os.path.dirname(os.path.abspath(self._path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as queries_file:
+                json.dump(queries, queries_file, indent=2, sort_keys=True)
+            os.replace(tmp_path, self._path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+
+def _selection_trees(document):
+    definitions = document.document_ast.definitions
+    fragments = {
+        definition.name.value: definition for definition in definitions
+        if isinstance(definition, ast.FragmentDefinition)
+    }
+    builder = SelectionTreeBuilder(fragments)
+    for operation in definitions:
+        if not isinstance(operation, ast.OperationDefinition):
+            continue
+        seen = set()
+        for field in operation.selection_set.selections:
+            if not isinstance(field, ast.Field) or not field.selection_set:
+                continue
+            key = selection_tree_key(document.document_string, operation, field)
+            if key in seen:
+                # As at execution, the first of several merged fields
+                # with the same response key is used.
+                continue
+            seen.add(key)
+            yield key, builder.build(field)
+
+
+def query_id(query):
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+_stores = dict()
+_stores_lock = threading.Lock()
+
+
+def persisted_query_store():
+    """The store at the GRAPH_WRAP_PERSISTED_QUERIES path, if set."""
+    path = getattr(settings, 'GRAPH_WRAP_PERSISTED_QUERIES', None)
+    if not path:
+        return None
+    with _stores_lock:
+        try:
+            return _stores[path]
+        except KeyError:
+            return _stores.setdefault(path, PersistedQueryStore(path))
+
+
+def persisted_queries_only():
+    """Whether only persisted queries may be executed (an allow-list)."""
+    return getattr(settings, 'GRAPH_WRAP_PERSISTED_QUERIES_ONLY', False)
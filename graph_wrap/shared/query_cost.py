@@ -0,0 +1,161 @@
+from __future__ import unicode_literals
+
+from django.conf import settings
+from graphql.error import GraphQLError
+from graphql.language import ast
+from graphql.type import GraphQLList, GraphQLNonNull
+from graphql.utils.get_operation_ast import get_operation_ast
+
+PAGE_SIZE_ARGUMENTS = ('first', 'limit')
+
+
+class QueryCostAnalyzer(object):
+    """Static estimate of the work a GraphQL operation asks for.
+
+    Every selected field costs 1, plus the cost of its own selection,
+    and a list field costs that many times its estimated number of
+    items: the value of its 'first' or 'limit' argument when given
+    and positive (which also applies to the 'items' of a page
+    field), else the estimate configured for the field in
+    LIST_SIZES, by '<type name>.<field name>' or by field name, else
+    DEFAULT_LIST_SIZE. Nested lists therefore multiply, as do the
+    REST dehydrations they lead to. The depth is the number of
+    nested fields. Introspection fields are not counted.
+    """
+    def __init__(self, schema, document_ast, variables, limits):
+        self._schema = schema
+        self._fragments = {
+            definition.name.value: definition
+            for definition in document_ast.definitions
+            if isinstance(definition, ast.FragmentDefinition)
+        }
+        self._variables = variables or {}
+        self._list_sizes = limits.get('LIST_SIZES', {})
+        self._default_list_size = limits.get('DEFAULT_LIST_SIZE', 20)
+
+    def analyze(self, operation):
+        """The (cost, depth) of operation."""
+        root_type = {
+            'query': self._schema.get_query_type(),
+            'mutation': self._schema.get_mutation_type(),
+            'subscription': self._schema.get_subscription_type(),
+        }[operation.operation]
+        return self._selection_set_cost(root_type, operation.selection_set)
+
+    def _selection_set_cost(self, parent_type, selection_set, page_size=None):
+        cost = depth = 0
+        for field, field_type in self._fields(parent_type, selection_set):
+            field_cost, field_depth = self._field_cost(
+                parent_type, field, field_type, page_size)
+            cost += field_cost
+            depth = max(depth, field_depth)
+        return cost, depth
+
+    def _field_cost(self, parent_type, field, field_type, page_size):
+        """The (cost, depth) of field.
+
+        page_size is the size requested of the page field whose type
+        is parent_type, if any, which applies to its list fields.
+        """
+        named_type = field_type
+        is_list = False
+        while isinstance(named_type, (GraphQLList, GraphQLNonNull)):
+            is_list = is_list or isinstance(named_type, GraphQLList)
+            named_type = named_type.of_type
+        own_page_size = self._page_size(field)
+        cost, depth = 1, 1
+        if field.selection_set:
+            sub_cost, sub_depth = self._selection_set_cost(
+                named_type,
+                field.selection_set,
+                None if is_list else own_page_size,
+            )
+            cost += sub_cost
+            depth += sub_depth
+        if is_list:
+            cost *= (
+                own_page_size or page_size or
+                self._list_size(parent_type, field)
+            )
+        return cost, depth
+
+    def _fields(self, parent_type, selection_set):
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                name = selection.name.value
+                if name.startswith('__'):
+                    continue
+                field_def = parent_type.fields.get(name)
+                if field_def is not None:
+                    yield selection, field_def.type
+                continue
+            if isinstance(selection, ast.FragmentSpread):
+                fragment = self._fragments.get(selection.name.value)
+                if fragment is None:
+                    continue
+                sub_selection_set = fragment.selection_set
+            else:
+                sub_selection_set = selection.selection_set
+            for field in self._fields(parent_type, sub_selection_set):
+                yield field
+
+    def _page_size(self, field):
+        for argument in field.arguments or []:
+            if argument.name.value not in PAGE_SIZE_ARGUMENTS:
+                continue
+            value = argument.value
+            if isinstance(value, ast.Variable):
+                value = self._variables.get(value.name.value)
+            elif isinstance(value, ast.IntValue):
+                value = int(value.value)
+            if isinstance(value, int) and value > 0:
+                return value
+        return None
+
+    def _list_size(self, parent_type, field):
+        name = field.name.value
+        qualified_name = '{}.{}'.format(parent_type.name, name)
+        for key in (qualified_name, name):
+            if key in self._list_sizes:
+                return self._list_sizes[key]
+        return self._default_list_size
+
+
+def check_query_limits(schema, document_ast, operation_name, variables):
+    """Errors for an operation over the GRAPH_WRAP_QUERY_LIMITS.
+
+    For example
+
+        GRAPH_WRAP_QUERY_LIMITS = {
+            'MAX_DEPTH': 6,
+            'MAX_COST': 10000,
+            'DEFAULT_LIST_SIZE': 20,
+            'LIST_SIZES': {'all_authors': 500, 'entries': 10},
+        }
+
+    (see QueryCostAnalyzer for the cost). Without the setting, or
+    without a MAX_DEPTH or MAX_COST in it, nothing is limited.
+    """
+    limits = getattr(settings, 'GRAPH_WRAP_QUERY_LIMITS', None)
+    if not limits:
+        return []
+    max_depth = limits.get('MAX_DEPTH')
+    max_cost = limits.get('MAX_COST')
+    if max_depth is None and max_cost is None:
+        return []
+    operation = get_operation_ast(document_ast, operation_name)
+    if operation is None:
+        # Left to graphql to report.
+        return []
+    cost, depth = QueryCostAnalyzer(
+        schema, document_ast, variables, limits).analyze(operation)
+    errors = []
+    if max_depth is not None and depth > max_depth:
+        errors.append(GraphQLError(
+            'Query depth of {} exceeds the maximum of {}.'.format(
+                depth, max_depth)))
+    if max_cost is not None and cost > max_cost:
+        errors.append(GraphQLError(
+            'Query cost of {} exceeds the maximum of {}.'.format(
+                cost, max_cost)))
+    return errors
@@ -4,7 +4,11 @@ import copy
 import json
 from abc import abstractmethod
 
-from graph_wrap.graphql_transformer import transform_graphql_resolve_info
+from django.conf import settings
+
+from graph_wrap.graphql_transformer import GraphQLResolveInfoTransformer
+from .instrumentation import traced_phase
+from .result_cache import connect_invalidation, result_cache
 
 
 class GrapheneFieldResolver:
@@ -47,18 +51,148 @@ class QueryResolverBase(GrapheneFieldResolver):
         pass
 
     def __call__(self, root, info, **kwargs):
-        get_request = transform_graphql_resolve_info(
-            self._field_name, info, **kwargs)
-        response = self._get_response(get_request, **kwargs)
+        memo = dispatch_memo(info.context)
+        if memo is None:
+            return self._cached_dispatch(info, **kwargs)
+        key = (self, self._dispatch_key(info, **kwargs))
+        try:
+            return memo[key]
+        except KeyError:
+            return memo.setdefault(
+                key, self._cached_dispatch(info, **kwargs))
+
+    def _cached_dispatch(self, info, **kwargs):
+        """Dispatch, unless the data is in the result cache."""
+        cache, timeout = self._result_cache()
+        if cache is None:
+            return self._dispatch(info, **kwargs)
+        key = cache.key(
+            info.context, self, self._dispatch_key(info, **kwargs))
+        data = cache.get(key)
+        if data is None:
+            data = self._dispatch(info, **kwargs)
+            cache.set(key, data, timeout)
+        return data
+
+    def _result_cache(self):
+        """The (ResultCache, timeout) of the resource's data.
+
+        (None, None) unless the resource is listed in the result
+        cache's TIMEOUTS.
+        """
+        cache = result_cache()
+        timeout = cache and cache.timeout(self._resource_name())
+        if timeout is None:
+            return None, None
+        model = self._resource_model()
+        if model is not None:
+            connect_invalidation(model)
+        return cache, timeout
+
+    def _dispatch(self, info, **kwargs):
+        get_request = self._transform_request(info, **kwargs)
+        with traced_phase(self._field_name, 'dispatch'):
+            response = self._get_response(get_request, **kwargs)
+        with traced_phase(self._field_name, 'render'):
+            response = self._render(response)
         if str(response.status_code).startswith('4'):
             raise Exception(response.content)
-        response_json = json.loads(response.content or '{}')
+        with traced_phase(self._field_name, 'decode'):
+            response_json = self._response_data(response)
         return response_json
 
+    def dispatches_on_call(self):
+        """Whether calling the resolver dispatches to the REST endpoint.
+
+        Resolvers which defer their dispatch (see
+        BatchedSingleItemResolverMixin) are cheap to call, so are not
+        worth resolving in a thread (see ConcurrentRootFieldExecutor).
+        """
+        return True
+
+    def _transform_request(self, info, **kwargs):
+        """The GET request to dispatch to the REST endpoint."""
+        transformer = GraphQLResolveInfoTransformer(
+            self._field_name, info, **kwargs)
+        with traced_phase(self._field_name, 'select'):
+            selected_fields = self._selected_fields(
+                transformer.transform_resolve_info())
+        with traced_phase(self._field_name, 'request'):
+            return transformer.transform_graphql_request(
+                selected_fields=selected_fields)
+
+    def _dispatch_key(self, info, **kwargs):
+        """Identifies the sub-dispatch of the field within the request.
+
+        Two resolutions of the field with the same arguments and the
+        same selected fields dispatch the very same sub-request.
+        """
+        selected_fields = self._selected_fields(GraphQLResolveInfoTransformer(
+            self._field_name, info, **kwargs).transform_resolve_info())
+        return json.dumps(
+            [kwargs, selected_fields], sort_keys=True, default=str)
+
+    def _selected_fields(self, selected_fields):
+        """The part of the field selection the REST endpoint serves."""
+        return selected_fields
+
     @abstractmethod
     def _get_response(self, request, **kwargs):
         pass
 
+    def _render(self, response):
+        """The response, rendered (if the backend defers rendering)."""
+        return response
+
+    @abstractmethod
+    def _resource_name(self):
+        """The name of the REST resource (as in the single item field)."""
+        pass
+
+    @abstractmethod
+    def _resource_model(self):
+        """The Django model of the REST resource, if any."""
+        pass
+
+    def _response_data(self, response):
+        """Python data for graphene to resolve the query from.
+
+        By default, the rendered JSON content of the REST response.
+        Backends override this to hand over the response data
+        directly when in-process responses are enabled (see
+        'in_process_responses').
+        """
+        return json.loads(response.content or '{}')
+
     @abstractmethod
     def _build_selected_fields_api(self):
         pass
+
+
+def in_process_responses():
+    """Whether to skip rendering REST responses to JSON.
+
+    When the GRAPH_WRAP_IN_PROCESS_RESPONSES setting is True, the
+    data produced by the REST view (DRF's response.data, tastypie's
+    dehydrated bundles) is passed straight to graphene rather than
+    being rendered to JSON and parsed back again.
+    """
+    return getattr(settings, 'GRAPH_WRAP_IN_PROCESS_RESPONSES', False)
+
+
+def dispatch_memo(request):
+    """The responses of the sub-dispatches made for this GraphQL request.
+
+    A document may resolve the same root field with the same
+    arguments and selected fields more than once (aliases of the
+    same field, fragments, ...): the data of the first dispatch is
+    reused for the others. On by default; set GRAPH_WRAP_DISPATCH_MEMO
+    to False to dispatch every resolution.
+    """
+    if not getattr(settings, 'GRAPH_WRAP_DISPATCH_MEMO', True):
+        return None
+    try:
+        return request._graph_wrap_dispatch_memo
+    except AttributeError:
+        memo = request._graph_wrap_dispatch_memo = dict()
+        return memo
@@ -0,0 +1,164 @@
+from __future__ import unicode_literals
+
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.utils.module_loading import import_string
+
+
+class ResultCache(object):
+    """Cache of the data of root fields, shared across requests.
+
+    Configured by the GRAPH_WRAP_RESULT_CACHE setting, for example
+
+        GRAPH_WRAP_RESULT_CACHE = {
+            'CACHE': 'default',
+            'TIMEOUTS': {'author': 3600, 'post': 60},
+            'SCOPE': 'user',
+        }
+
+    Only the resources listed in TIMEOUTS (by basename or
+    resource_name) are cached, each for its number of seconds. The
+    data is keyed by the root field, its arguments and selected
+    fields, and the scope of the request: 'user' (the default) keeps
+    the data of each user (and each Authorization header) apart,
+    'global' shares it between everyone, and any other value is the
+    dotted path to a function of the request returning its scope.
+
+    Saving or deleting an instance of a resource's model invalidates
+    the resource's cached data, as does 'invalidate_result_cache'.
+    Data nested from other resources is only refreshed once the
+    timeout expires, or on an explicit invalidation.
+    """
+    def __init__(self, config):
+        self._cache = caches[config.get('CACHE', 'default')]
+        self._timeouts = config.get('TIMEOUTS', {})
+        self._scope = config.get('SCOPE', 'user')
+
+    def timeout(self, resource_name):
+        return self._timeouts.get(resource_name)
+
+    def key(self, request, resolver, dispatch_key):
+        generations = _generations(self._cache, resolver._resource_model())
+        key = json.dumps([
+            type(resolver).__module__,
+            resolver._field_name,
+            dispatch_key,
+            self._request_scope(request),
+            generations,
+        ])
+        return 'graph_wrap:result:{}'.format(
+            hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, data, timeout):
+        self._cache.set(key, data, timeout)
+
+    def invalidate(self, model=None):
+        key = _generation_key(model)
+        try:
+            self._cache.incr(key)
+        except ValueError:
+            self._cache.add(key, _new_generation(), None)
+
+    def _request_scope(self, request):
+        if self._scope == 'global':
+            return None
+        if self._scope != 'user':
+            return import_string(self._scope)(request)
+        user = getattr(request, 'user', None)
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        return [
+            user.pk if user is not None and user.is_authenticated else None,
+            hashlib.sha256(authorization.encode('utf-8')).hexdigest()
+            if authorization else None,
+        ]
+
+
+def _generation_key(model):
+    if model is None:
+        return 'graph_wrap:generation'
+    return 'graph_wrap:generation:{}'.format(model._meta.label_lower)
+
+
+def _generations(cache, model):
+    """The current generations of the cached data (of model).
+
+    Generations are bumped on invalidation and are part of the
+    result keys, so invalidated data is simply never read again.
+    A generation evicted from the cache restarts from the current
+    time, which never matches an earlier generation.
+    """
+    keys = [_generation_key(None)]
+    if model is not None:
+        keys.append(_generation_key(model))
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, _new_generation(), None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def _new_generation():
+    return int(time.time() * 1000000)
+
+
+def invalidate_result_cache(model=None):
+    """Invalidate the cached data of model's resources, or all of it."""
+    cache = result_cache()
+    if cache is not None:
+        cache.invalidate(model)
+
+
+def result_cache():
+    """The ResultCache, when GRAPH_WRAP_RESULT_CACHE is configured."""
+    config = getattr(settings, 'GRAPH_WRAP_RESULT_CACHE', None)
+    if not config:
+        return None
+    return ResultCache(config)
+
+
+def connect_cached_resources(resource_models):
+    """Invalidate the cached data of resources when their models change.
+
+    resource_models are the (resource name, model) pairs of a
+    backend's resources; the receivers are only connected for the
+    models of the resources listed in TIMEOUTS. Called by the
+    backends' GraphWrapConfig.ready, so that processes which save
+    models without serving GraphQL (workers, commands, ...) invalidate
+    the cached data too. Resources served with the cache are
+    connected on first use as well (see connect_invalidation).
+    """
+    config = getattr(settings, 'GRAPH_WRAP_RESULT_CACHE', None)
+    if not config:
+        return
+    timeouts = config.get('TIMEOUTS', {})
+    for resource_name, model in resource_models:
+        if resource_name in timeouts and model is not None:
+            connect_invalidation(model)
+
+
+_connected_models = set()
+
+
+def connect_invalidation(model):
+    """Invalidate the cached data of model's resources when it changes."""
+    if model in _connected_models:
+        return
+    uid = 'graph_wrap_result_cache_{}'.format(model._meta.label_lower)
+    post_save.connect(
+        _invalidate_on_change, sender=model, dispatch_uid=uid + '_save')
+    post_delete.connect(
+        _invalidate_on_change, sender=model, dispatch_uid=uid + '_delete')
+    _connected_models.add(model)
+
+
+def _invalidate_on_change(sender, **kwargs):
+    invalidate_result_cache(sender)
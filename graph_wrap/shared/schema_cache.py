@@ -0,0 +1,129 @@
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaCache(object):
+    """Process-wide cache for a built graphene Schema.
+
+    Building the schema walks the whole REST API (URL enumeration,
+    serializer introspection, dynamic ObjectType creation), so we
+    only want to pay that cost once per process. The schema is built
+    lazily on the first call to 'get' and reused until either
+    'invalidate' is called explicitly or the value returned by
+    'cache_key' changes (e.g. the URLconf is reloaded or the tastypie
+    Api registry gains a resource).
+
+    'build_schema' is called with an optional 'timings' dictionary,
+    into which the schema factory records how long each phase of
+    the build took (see 'timed_phase').
+    """
+    def __init__(self, build_schema, cache_key):
+        self._build_schema = build_schema
+        self._cache_key = cache_key
+        self._lock = threading.Lock()
+        self._schema = None
+        self._key = None
+
+    def get(self):
+        key = self._cache_key()
+        schema, cached_key = self._schema, self._key
+        if schema is not None and cached_key == key:
+            return schema
+        with self._lock:
+            if self._schema is None or self._key != key:
+                self._replaced(self._schema)
+                self._schema = self._build_schema()
+                self._key = key
+            return self._schema
+
+    def set(self, schema):
+        with self._lock:
+            if schema is not self._schema:
+                self._replaced(self._schema)
+            self._schema = schema
+            self._key = self._cache_key()
+
+    def warm_up(self):
+        """Build the schema now rather than on the first request.
+
+        Intended to be called at process start-up (see the
+        AppConfig classes of each backend). Logs and returns the
+        time spent in each phase of the build.
+        """
+        timings = dict()
+        start = time.perf_counter()
+        self.set(self._build_schema(timings=timings))
+        total = time.perf_counter() - start
+        logger.info(
+            'graph_wrap schema built in %.3fs (%s)',
+            total,
+            ', '.join(
+                '{}={:.3f}s'.format(phase, seconds)
+                for phase, seconds in timings.items()),
+        )
+        return timings
+
+    def invalidate(self):
+        with self._lock:
+            self._replaced(self._schema)
+            self._schema = None
+            self._key = None
+
+    def _replaced(self, schema):
+        """Drop the documents cached for schema, which is being replaced."""
+        if schema is not None:
+            from .document_cache import document_backend
+            document_backend().clear()
+
+
+def warm_up_enabled():
+    """Whether the backends' GraphWrapConfig build the schema in ready().
+
+    Off by default: set GRAPH_WRAP_WARM_UP_SCHEMA to True (typically
+    only in the settings of the web processes) to build the schema at
+    start-up. Otherwise, it is built on the first GraphQL request, so
+    that management commands such as 'migrate' never build it.
+    """
+    return getattr(settings, 'GRAPH_WRAP_WARM_UP_SCHEMA', False)
+
+
+def urlconf_cache_key():
+    """Key identifying the URLconf (and settings) a schema was built from.
+
+    django.urls.get_resolver is itself cached and is cleared whenever
+    the URLconf is reloaded (clear_url_caches, override_settings of
+    ROOT_URLCONF), so a new resolver instance means the set of
+    registered views may have changed.
+    """
+    return (
+        get_resolver(),
+        getattr(settings, 'LIST_ENDPOINT_RESOLVER_PREFIX', None),
+    )
+
+
+@contextmanager
+def timed_phase(timings, phase):
+    """Add the time spent in the with-block to timings[phase].
+
+    Timings accumulate, so a phase entered once per API (e.g.
+    nested serializer collection) reports its total. Passing
+    timings=None disables recording.
+    """
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = (
+            timings.get(phase, 0.0) + time.perf_counter() - start)
@@ -1,6 +1,8 @@
 import graphene
 from django.conf import settings
 
+from .pagination import page_arguments, page_type
+
 
 def get_query_attributes(
         api,
@@ -8,6 +10,7 @@ def get_query_attributes(
         graphene_type,
         single_item_resolver_cls,
         all_items_resolver_cls,
+        page_resolver_cls=None,
         **filters,
 ):
     all_items_field_name = get_list_endpoint_resolver_name(single_item_field_name)
@@ -17,7 +20,7 @@ def get_query_attributes(
         id_type = graphene_type.id.__class__
     except AttributeError:
         id_type = graphene.Int
-    return {
+    query_attributes = {
         single_item_field_name: graphene.Field(
             graphene_type,
             id=id_type(required=True),
@@ -30,6 +33,19 @@ def get_query_attributes(
         all_items_resolver_name: all_items_resolver_cls(
             field_name=all_items_field_name, api=api),
     }
+    if page_resolver_cls is not None:
+        page_field_name = '{}_page'.format(all_items_field_name)
+        page_arguments_and_filters = dict(page_arguments(), **filters)
+        query_attributes.update({
+            page_field_name: graphene.Field(
+                page_type(graphene_type),
+                name=page_field_name,
+                **page_arguments_and_filters
+            ),
+            'resolve_{}'.format(page_field_name): page_resolver_cls(
+                field_name=page_field_name, api=api),
+        })
+    return query_attributes
 
 
 def get_list_endpoint_resolver_name(single_item_field_name):
@@ -0,0 +1,218 @@
+from __future__ import unicode_literals
+
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from graphql.error import GraphQLError
+from graphql.execution.base import ResolveInfo
+from graphql.execution.values import get_argument_values, get_variable_values
+from graphql.language import ast
+from graphql.type import (
+    GraphQLEnumType,
+    GraphQLList,
+    GraphQLNonNull,
+    GraphQLObjectType,
+    GraphQLScalarType,
+)
+from graphql.utils.get_operation_ast import get_operation_ast
+
+from .query_resolver import JSONResolver
+
+
+class NotStreamable(Exception):
+    pass
+
+
+class ListStream(object):
+    """Streams the response to a query selecting a single list field.
+
+    Executing a query materializes the whole list several times over
+    (the model instances, the serialized data, the completed GraphQL
+    result and its JSON). For a query such as
+
+        query { all_posts { content author { name } } }
+
+    whose only root field is a list field with a streaming resolver
+    (one providing a 'stream' method), the items are instead fetched
+    from the database, serialized and written to the response a chunk
+    at a time, so memory stays constant whatever the number of items.
+
+    Each item is completed against the schema as graphql would (the
+    selected fields under their response keys, fragments included,
+    and scalars serialized by their type). Documents using anything
+    else (directives, __typename, several root fields, ...) are not
+    streamed; see 'plan'.
+    """
+    def __init__(self, response_key, item_type, projection, chunks):
+        self._response_key = response_key
+        self._item_type = item_type
+        self._projection = projection
+        self._chunks = chunks
+
+    @classmethod
+    def plan(cls, schema, document_ast, operation_name, variables,
+             context, root_value, chunk_size):
+        """The ListStream of the operation, or None if not streamable.
+
+        The REST endpoint is checked (authentication, permissions,
+        ...) before returning, so that a document whose stream could
+        not start is left to the usual execution to report.
+        """
+        operation = get_operation_ast(document_ast, operation_name)
+        if operation is None or operation.operation != 'query':
+            return None
+        selections = operation.selection_set.selections
+        if len(selections) != 1:
+            return None
+        field_ast = selections[0]
+        if not isinstance(field_ast, ast.Field) or field_ast.directives:
+            return None
+        query_type = schema.get_query_type()
+        field_def = query_type.fields.get(field_ast.name.value)
+        if field_def is None or not hasattr(field_def.resolver, 'stream'):
+            return None
+        item_type = _list_item_type(field_def.type)
+        if item_type is None:
+            return None
+        fragments = {
+            definition.name.value: definition
+            for definition in document_ast.definitions
+            if isinstance(definition, ast.FragmentDefinition)
+        }
+        try:
+            projection = _projection(
+                item_type, field_ast.selection_set, fragments)
+            variable_values = get_variable_values(
+                schema, operation.variable_definitions or [], variables)
+            arguments = get_argument_values(
+                field_def.args, field_ast.arguments, variable_values)
+        except (NotStreamable, GraphQLError):
+            return None
+        response_key = (field_ast.alias or field_ast.name).value
+        info = ResolveInfo(
+            field_ast.name.value,
+            [field_ast],
+            field_def.type,
+            query_type,
+            schema,
+            fragments,
+            root_value,
+            operation,
+            variable_values,
+            context,
+            path=[response_key],
+        )
+        chunks = field_def.resolver.stream(info, chunk_size, **arguments)
+        if chunks is None:
+            return None
+        return cls(response_key, item_type, projection, chunks)
+
+    def json_chunks(self):
+        """Incrementally write the JSON of the response."""
+        yield '{{"data":{{{}:['.format(json.dumps(self._response_key))
+        separator = ''
+        for chunk in self._chunks:
+            items = [
+                json.dumps(_complete(self._item_type, self._projection, item))
+                for item in chunk
+            ]
+            if items:
+                yield separator + ','.join(items)
+                separator = ','
+        yield ']}}'
+
+
+def _list_item_type(graphql_type):
+    if isinstance(graphql_type, GraphQLNonNull):
+        graphql_type = graphql_type.of_type
+    if not isinstance(graphql_type, GraphQLList):
+        return None
+    item_type = _named_type(graphql_type.of_type)
+    if not isinstance(item_type, GraphQLObjectType):
+        return None
+    return graphql_type.of_type
+
+
+def _named_type(graphql_type):
+    while isinstance(graphql_type, (GraphQLNonNull, GraphQLList)):
+        graphql_type = graphql_type.of_type
+    return graphql_type
+
+
+def _projection(graphql_type, selection_set, fragments, projection=None):
+    """The fields selected on an object type, by response key.
+
+    Maps each response key to the name of the JSON key the field's
+    JSONResolver reads, the field's type and the projection of its
+    own selection (for object types).
+    """
+    object_type = _named_type(graphql_type)
+    if projection is None:
+        projection = OrderedDict()
+    for selection in selection_set.selections:
+        if selection.directives:
+            raise NotStreamable()
+        if isinstance(selection, ast.FragmentSpread):
+            try:
+                fragment = fragments[selection.name.value]
+            except KeyError:
+                raise NotStreamable()
+            _projection(
+                graphql_type, fragment.selection_set, fragments, projection)
+            continue
+        if isinstance(selection, ast.InlineFragment):
+            _projection(
+                graphql_type, selection.selection_set, fragments, projection)
+            continue
+        field_def = object_type.fields.get(selection.name.value)
+        if field_def is None or not isinstance(
+                field_def.resolver, JSONResolver):
+            raise NotStreamable()
+        key = (selection.alias or selection.name).value
+        sub_projection = None
+        if selection.selection_set:
+            sub_projection = _projection(
+                field_def.type, selection.selection_set, fragments)
+        entry = (field_def.resolver._field_name, field_def.type, sub_projection)
+        if key in projection and (
+                projection[key] != entry or sub_projection is not None):
+            # Merging the sub-selections of repeated fields is left
+            # to graphql.
+            raise NotStreamable()
+        projection[key] = entry
+    return projection
+
+
+def _complete(graphql_type, projection, value):
+    if value is None:
+        return None
+    if isinstance(graphql_type, GraphQLNonNull):
+        return _complete(graphql_type.of_type, projection, value)
+    if isinstance(graphql_type, GraphQLList):
+        return [
+            _complete(graphql_type.of_type, projection, item)
+            for item in value
+        ]
+    if isinstance(graphql_type, (GraphQLScalarType, GraphQLEnumType)):
+        return graphql_type.serialize(value)
+    return OrderedDict(
+        (key, _complete(field_type, sub_projection, value.get(json_key)))
+        for key, (json_key, field_type, sub_projection) in projection.items()
+    )
+
+
+def streaming_lists_enabled():
+    """Whether single list field queries are streamed (see ListStream).
+
+    Off by default; set GRAPH_WRAP_STREAMING_LISTS to True.
+    """
+    return getattr(settings, 'GRAPH_WRAP_STREAMING_LISTS', False)
+
+
+def streaming_chunk_size():
+    """Number of items fetched and serialized at a time when streaming.
+
+    Set by GRAPH_WRAP_STREAMING_CHUNK_SIZE.
+    """
+    return getattr(settings, 'GRAPH_WRAP_STREAMING_CHUNK_SIZE', 1000)
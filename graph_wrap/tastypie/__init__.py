@@ -1,9 +1,27 @@
 from graph_wrap.tastypie.graphql_view import graphql_view
+from graph_wrap.shared.schema_cache import SchemaCache, urlconf_cache_key
 
 
-def schema():
+def _build_schema(timings=None):
+    from graph_wrap.tastypie.schema_factory import SchemaFactory
+    return SchemaFactory.create_from_api(timings=timings)
+
+
+def _cache_key():
     from graph_wrap.tastypie.schema_factory import SchemaFactory
-    return SchemaFactory.create_from_api()
+    api = SchemaFactory.registered_api()
+    return urlconf_cache_key() + (tuple(api._registry.items()),)
+
+
+schema_cache = SchemaCache(_build_schema, _cache_key)
+
+
+def schema():
+    return schema_cache.get()
+
+
+def invalidate_schema():
+    schema_cache.invalidate()
 
 
-__all__ = ['schema', 'graphql_view']
+__all__ = ['schema', 'invalidate_schema', 'graphql_view']
@@ -1,8 +1,9 @@
 from __future__ import unicode_literals
 
-from graphene_django.views import GraphQLView
 from tastypie.resources import Resource
 
+from graph_wrap.shared.graphql_view import GraphWrapGraphQLView
+
 
 class GraphQLResource(Resource):
     class Meta:
@@ -12,6 +13,6 @@ class GraphQLResource(Resource):
     def dispatch(self, request_type, request, **kwargs):
         from graph_wrap.tastypie import schema
         schema = schema()
-        view = GraphQLView.as_view(schema=schema)
+        view = GraphWrapGraphQLView.as_view(schema=schema)
         return view(request)
 
@@ -1,20 +1,51 @@
 from __future__ import unicode_literals
 
-import copy
+import weakref
 from functools import partial
 
+from django.http import HttpResponse
 from tastypie.exceptions import BadRequest
+from tastypie.resources import Resource
 
-from graph_wrap.shared.query_resolver import QueryResolverBase
+from graph_wrap.shared.batching import BatchedSingleItemResolverMixin
+from graph_wrap.shared.column_pruning import (
+    column_pruning_enabled,
+    model_column,
+    only_columns,
+)
+from graph_wrap.shared.document_cache import LRUCache
+from graph_wrap.shared.pagination import PageQueryResolverMixin
+from graph_wrap.shared.query_resolver import (
+    QueryResolverBase,
+    in_process_responses,
+)
+
+DETAIL_LOOKUP_METHODS = (
+    'dispatch_detail', 'get_detail', 'cached_obj_get', 'obj_get')
 
 
 class QueryResolver(QueryResolverBase):
+    def __init__(self, field_name, api):
+        super(QueryResolver, self).__init__(field_name, api)
+        self._selected_fields_api = self._build_selected_fields_api()
 
     def _get_response(self, request, **kwargs):
         resolver = self.rest_api_resolver_method(**kwargs)
         response = resolver(request)
         return response
 
+    def _response_data(self, response):
+        data = getattr(response, 'data', None)
+        if data is not None:
+            return data
+        return super(QueryResolver, self)._response_data(response)
+
+    def _resource_name(self):
+        return self._api._meta.resource_name
+
+    def _resource_model(self):
+        return self._api._meta.object_class
+
     def _build_selected_fields_api(self):
         """Mutate resource so that only selected fields are dehydrated.
 
@@ -22,7 +53,18 @@ class QueryResolver(QueryResolverBase):
          standard tastypie full_dehydrate resource method to the input
          method. This customised version ensures we only iterate over
          and hence dehydrate the fields as dictated by the appropriate
-         key in the 'selected_fields' dictionary.
+         key in the 'selected_fields' dictionary. Likewise, a
+         customised create_response is bound which, for in-process
+         responses, attaches the data to the response instead of
+         serializing it, and a customised get_object_list which, with
+         column pruning enabled, only loads the selected columns.
+
+         This is done once, when the resolver is created, on the
+         resolver's own copy of the resource. The selection itself is
+         read from each request's environ and passed down explicitly
+         during dehydration, so no state is shared between concurrent
+         requests and the resource is never modified while serving
+         them.
 
          Whilst this approach of dynamically binding a custom method
          at run time may seem strange, it has been chosen for two
@@ -43,6 +85,10 @@ class QueryResolver(QueryResolverBase):
          """
         self._api.full_dehydrate = _selectable_fields_full_dehydrate.__get__(
             self._api)
+        self._api.create_response = _in_process_create_response.__get__(
+            self._api)
+        self._api.get_object_list = _column_pruning_get_object_list.__get__(
+            self._api)
         return self._api
 
 
@@ -67,11 +113,38 @@ class AllItemsQueryResolver(QueryResolver):
                 return response_json
 
     def rest_api_resolver_method(self, **kwargs):
-        selectable_fields_resource = self._build_selected_fields_api()
-        return getattr(selectable_fields_resource, 'dispatch_list')
+        return getattr(self._selected_fields_api, 'dispatch_list')
+
+
+class PageQueryResolver(PageQueryResolverMixin, QueryResolver):
+    """Callable which acts as resolver for an 'all_items_page' field.
+
+    Pages through the list endpoint using the resource's paginator.
+    """
+    def rest_api_resolver_method(self, **kwargs):
+        return getattr(self._selected_fields_api, 'dispatch_list')
 
+    def _pagination_params(self, size, offset):
+        params = dict()
+        if size is not None:
+            params['limit'] = str(size)
+        if offset is not None:
+            params['offset'] = str(offset)
+        return params
 
-class SingleItemQueryResolver(QueryResolver):
+    def _page(self, data):
+        if 'error' in data:
+            raise BadRequest(data['error'])
+        meta = data.get('meta', {})
+        return (
+            data[self._selected_fields_api._meta.collection_name],
+            meta.get('next'),
+            meta.get('previous'),
+            meta.get('total_count'),
+        )
+
+
+class SingleItemQueryResolver(BatchedSingleItemResolverMixin, QueryResolver):
     """Callable which acts as resolver for an 'single item' field' on the Query.
 
     For example, if we had a tastypie ProfileResource with underlying
@@ -84,41 +157,198 @@ class SingleItemQueryResolver(QueryResolver):
     """
 
     def rest_api_resolver_method(self, **kwargs):
-        selectable_fields_resource = self._build_selected_fields_api()
+        if 'batch_pks' in kwargs:
+            # The /resource/set/<pk_list>/ endpoint: a single
+            # obj_get_list fetch filtered on the pks.
+            meta = self._selected_fields_api._meta
+            return partial(
+                self._selected_fields_api.wrap_view('get_multiple'),
+                **{'{}_list'.format(meta.detail_uri_name): ';'.join(
+                    str(pk) for pk in kwargs['batch_pks'])}
+            )
         return partial(
-            getattr(selectable_fields_resource, 'dispatch_detail'),
+            getattr(self._selected_fields_api, 'dispatch_detail'),
             pk=kwargs['id'],
         )
 
+    def _batchable(self):
+        """Whether the resource looks items up with tastypie's own methods.
+
+        The batch goes through get_multiple and obj_get_list, so
+        resources customising dispatch_detail, get_detail,
+        cached_obj_get or obj_get are dispatched item by item.
+        """
+        resource = type(self._api)
+        return not any(
+            _overrides(resource, name) for name in DETAIL_LOOKUP_METHODS)
+
+    def _batch_items(self, data, item_ids):
+        not_found = set(data.get('not_found', []))
+        found = [
+            str(item_id) for item_id in item_ids
+            if str(item_id) not in not_found
+        ]
+        objects = data.get(self._selected_fields_api._meta.collection_name, [])
+        return dict(zip(found, objects))
+
+
+def _overrides(cls, method_name):
+    """Whether cls has method_name from a class outside of tastypie."""
+    for klass in cls.__mro__:
+        if method_name in vars(klass):
+            return not klass.__module__.startswith('tastypie.')
+    return False
+
+
+def _in_process_create_response(
+        api, request, data, response_class=HttpResponse, **response_kwargs):
+    if in_process_responses():
+        response = response_class(**response_kwargs)
+        if response.status_code < 400:
+            # The same simplification tastypie applies before
+            # serializing, minus the serialization itself.
+            response.data = api._meta.serializer.to_simple(data, {})
+            return response
+    return api.__class__.create_response(
+        api, request, data, response_class=response_class, **response_kwargs)
+
+
+def _column_pruning_get_object_list(api, request):
+    object_list = api.__class__.get_object_list(api, request)
+    if not column_pruning_enabled():
+        return object_list
+    columns = _selected_columns(
+        api, request.environ.get('selected_fields', {}))
+    return only_columns(object_list, columns)
+
+
+def _selected_columns(resource, selected_fields):
+    """The model columns needed to dehydrate the selected fields.
+
+    Returns None (i.e. load every column) if any selected field reads
+    something other than a single model field, or if the resource
+    customises dehydration, since we then can't tell what is read.
+    """
+    model = getattr(resource._meta, 'object_class', None)
+    if model is None or type(resource).dehydrate is not Resource.dehydrate:
+        return None
+    columns = [model._meta.pk.name]
+    for field_name, field in _selected_fields_view(resource, selected_fields):
+        if field_name == 'resource_uri':
+            # Built from the detail_uri_name, by default the pk.
+            columns.append(resource._meta.detail_uri_name)
+            continue
+        if getattr(resource, 'dehydrate_{}'.format(field_name), None):
+            return None
+        attribute = field.attribute
+        if attribute is None:
+            # Dehydrates to the field's default.
+            continue
+        if not isinstance(attribute, str):
+            return None
+        column = model_column(model, attribute.split('__'))
+        if column is None:
+            return None
+        columns.append(column)
+    return columns
+
 
 def _selectable_fields_full_dehydrate(api, bundle, for_list=False):
-    fields = {}
-    selected_fields = bundle.request.environ.get('selected_fields', [])
-    for field_name, field in api.fields.items():
-        if field_name in selected_fields:
-            if field.dehydrated_type == 'related':
-                field.dehydrate = _selectable_fields_dehydrate.__get__(field)
-            fields[field_name] = field
-    api.fields = fields
-    return api.__class__.full_dehydrate(api, bundle, for_list)
-
-
-def _selectable_fields_dehydrate(field, bundle, for_list=True):
-    field.full = True
-    field.full_list = lambda x: True
-    field.full_detail = lambda x: True
-    field.get_related_resource = _selectable_fields_get_related.__get__(field)
-    selection = bundle.request.environ['selected_fields']
-    bundle.request.environ['selected_fields'] = selection[field.instance_name]
-    result = field.__class__.dehydrate(field, bundle, for_list)
-    bundle.request.environ['selected_fields'] = selection
-    return result
-
-
-def _selectable_fields_get_related(field, related_instance):
-    related_resource = copy.deepcopy(field.__class__.get_related_resource(
-        field, related_instance))
-    related_resource.full_dehydrate = _selectable_fields_full_dehydrate.__get__(
-        related_resource)
-    return related_resource
+    selected_fields = bundle.request.environ.get('selected_fields', {})
+    return _dehydrate_selected_fields(api, bundle, selected_fields, for_list)
+
+
+def _dehydrate_selected_fields(resource, bundle, selected_fields, for_list):
+    """Dehydrate only the selected fields of resource.
+
+    Mirrors tastypie's Resource.full_dehydrate, but iterates over the
+    (cached) selected fields view of the resource rather than all of
+    its fields. Related fields are always dehydrated in full (i.e.
+    as nested data rather than resource URIs), restricted to the
+    nested selection. Neither the resource nor its fields are
+    modified, and no copies of them are made: the api and resource
+    names tastypie sets on related fields (for URI resolution) are
+    set on their stand-ins instead.
+    """
+    data = bundle.data
+    api_name = resource._meta.api_name
+    resource_name = resource._meta.resource_name
+    for field_name, field in _selected_fields_view(resource, selected_fields):
+        field_use_in = field.use_in
+        if callable(field_use_in):
+            if not field_use_in(bundle):
+                continue
+        elif field_use_in not in ['all', 'list' if for_list else 'detail']:
+            continue
+        if field.dehydrated_type == 'related':
+            field = _SelectedRelatedField(field, selected_fields[field_name])
+            field.api_name = api_name
+            field.resource_name = resource_name
+        data[field_name] = field.dehydrate(bundle, for_list=for_list)
+        method = getattr(resource, 'dehydrate_{}'.format(field_name), None)
+        if method:
+            data[field_name] = method(bundle)
+    return resource.dehydrate(bundle)
+
+
+_selected_fields_views = weakref.WeakKeyDictionary()
+
+# Selections of a resource whose views are kept.
+SELECTED_FIELDS_VIEWS_PER_RESOURCE = 256
+
 
+def _selected_fields_view(resource, selected_fields):
+    """Return the (name, field) pairs of resource which are selected.
+
+    The views are computed once per resource and selection and
+    shared between all dehydrations (and requests) thereafter, for
+    the SELECTED_FIELDS_VIEWS_PER_RESOURCE most recent selections.
+    """
+    key = frozenset(selected_fields)
+    try:
+        views = _selected_fields_views[resource]
+    except KeyError:
+        views = _selected_fields_views.setdefault(
+            resource, LRUCache(SELECTED_FIELDS_VIEWS_PER_RESOURCE))
+    view = views.get(key)
+    if view is None:
+        view = tuple(
+            (field_name, field) for field_name, field in
+            resource.fields.items() if field_name in key
+        )
+        views.set(key, view)
+    return view
+
+
+class _SelectedRelatedField(object):
+    """Stand-in for a tastypie related field during selective dehydration.
+
+    Delegates everything to the wrapped field, except that related
+    objects are fully dehydrated with only the nested selected fields.
+    This lets us reuse the field's own logic for fetching the
+    related object(s) without modifying the field.
+    """
+    def __init__(self, field, selected_fields):
+        self._field = field
+        self._selected_fields = selected_fields
+
+    def __getattr__(self, name):
+        return getattr(self._field, name)
+
+    def dehydrate(self, bundle, for_list=True):
+        return self._field.__class__.dehydrate(self, bundle, for_list)
+
+    def dehydrate_related(self, bundle, related_resource, for_list=True):
+        related_bundle = related_resource.build_bundle(
+            obj=bundle.obj,
+            request=bundle.request,
+            objects_saved=bundle.objects_saved,
+        )
+        # As tastypie does, related resources are dehydrated as
+        # details (for_list=False), whatever the parent's mode.
+        return _dehydrate_selected_fields(
+            related_resource,
+            related_bundle,
+            self._selected_fields,
+            for_list=False,
+        )
@@ -5,9 +5,11 @@ from django.conf import settings
 from graphene_django.settings import perform_import
 from tastypie.resources import ModelResource
 
+from graph_wrap.shared.schema_cache import timed_phase
 from graph_wrap.shared.schema_factory import get_query_attributes
 from .query_resolver import (
     AllItemsQueryResolver,
+    PageQueryResolver,
     SingleItemQueryResolver,
 )
 from .api_transformer import transform_api
@@ -32,11 +34,12 @@ class SchemaFactory(object):
     """
     api_class_to_schema = dict()
 
-    def __init__(self, apis):
+    def __init__(self, apis, timings=None):
         self._apis = apis
+        self._timings = timings
 
     @classmethod
-    def create_from_api(cls):
+    def create_from_api(cls, timings=None):
         # change name. Maybe make this whole class into a function?
         """
         Create a schema from the tastypie API instance.
@@ -44,27 +47,37 @@ class SchemaFactory(object):
         Can pass either the full python path of the API
         instance or an Api instance itself.
         """
-        api = perform_import(settings.TASTYPIE_API_PATH, '')
+        with timed_phase(timings, 'registered_api'):
+            api = cls.registered_api()
         resources = api._registry.values()
-        return cls(resources).create()
+        return cls(resources, timings=timings).create()
+
+    @staticmethod
+    def registered_api():
+        return perform_import(settings.TASTYPIE_API_PATH, '')
 
     def create(self):
         query_class_attrs = dict()
         for resource in self._usable_apis():
-            graphene_type = transform_api(resource)
-            query_attributes = get_query_attributes(
-                resource,
-                resource._meta.resource_name,
-                graphene_type,
-                SingleItemQueryResolver,
-                AllItemsQueryResolver,
-                orm_filters=graphene.String(name='orm_filters'),
-            )
+            with timed_phase(self._timings, 'build_types'):
+                graphene_type = transform_api(resource)
+                query_attributes = get_query_attributes(
+                    resource,
+                    resource._meta.resource_name,
+                    graphene_type,
+                    SingleItemQueryResolver,
+                    AllItemsQueryResolver,
+                    PageQueryResolver,
+                    orm_filters=graphene.String(name='orm_filters'),
+                )
             query_class_attrs.update(**query_attributes)
             self.api_class_to_schema[resource.__class__] = (
                 graphene_type)
-        Query = type(str('Query'), (graphene.ObjectType,), query_class_attrs)
-        return graphene.Schema(query=Query)
+        with timed_phase(self._timings, 'build_schema'):
+            Query = type(
+                str('Query'), (graphene.ObjectType,), query_class_attrs)
+            schema = graphene.Schema(query=Query)
+        return schema
 
     def _usable_apis(self):
         return [
@@ -2,17 +2,60 @@ from __future__ import unicode_literals
 
 import datetime
 import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from unittest import mock
 
+from django.apps import apps
 from django.conf import settings
-from django.test import TransactionTestCase
-from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.urls import clear_url_caches
+from django.contrib.auth.models import AnonymousUser, User
+from django.test.utils import CaptureQueriesContext
 from graphene.types.definitions import GrapheneObjectType
 from graphql import GraphQLScalarType, GraphQLNonNull, GraphQLList
+from rest_framework import serializers
+from rest_framework.generics import GenericAPIView
+from rest_framework.mixins import RetrieveModelMixin
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.views import APIView
 
+from graph_wrap.django_rest_framework import (
+    schema, schema_cache, invalidate_schema)
+from graph_wrap.django_rest_framework.api_transformer import (
+    FieldTransformerMeta,
+    IntegerValuedFieldTransformer,
+    SerializerTypeNames,
+)
+from graph_wrap.django_rest_framework.apps import _resource_models
+from graph_wrap.django_rest_framework.graphql_view import graphql_view
+from graph_wrap.django_rest_framework.query_resolver import QueryResolver
 from graph_wrap.django_rest_framework.schema_factory import SchemaFactory
+from graph_wrap.django_rest_framework.schema_snapshot import (
+    SnapshotError, api_fingerprint)
+from graph_wrap.shared.document_cache import (
+    document_backend, selection_tree_cache, selection_tree_key)
+from graph_wrap.shared.instrumentation import PHASES
+from graph_wrap.shared.persisted_queries import persisted_query_store
+from graph_wrap.shared.result_cache import connect_cached_resources
+from tests.django_rest_framework_api.api import (
+    AuthorSerializer, PostSerializer, PostViewSet, WrittenBySerializer)
 from tests.models import Author, Post, Media
 
 
+class RecordingTracer(object):
+    events = []
+
+    @contextmanager
+    def trace(self, event):
+        yield
+        self.events.append(event)
+
+
 class TestGraphWrapBase(TransactionTestCase):
     def setUp(self):
         super(TestGraphWrapBase, self).setUp()
@@ -76,7 +119,8 @@ class TestSchemaFactory(TestGraphWrapBase):
 
     def test_query_fields(self):
         self.assertEqual(
-            {'author', 'all_authors', 'post', 'all_posts'},
+            {'author', 'all_authors', 'all_authors_page',
+             'post', 'all_posts', 'all_posts_page'},
             set(self.query.fields),
         )
 
@@ -130,17 +174,369 @@ class TestSchemaFactory(TestGraphWrapBase):
         self.assertFieldType(post_type, 'author', GraphQLNonNull)
         self.assertFieldTypeOfType(post_type, 'author', GrapheneObjectType)
 
+    def test_selected_fields_view_reused(self):
+        resolver = self.query.graphene_type.resolve_all_authors
+        self.assertIs(
+            resolver.rest_api_resolver_method(),
+            resolver.rest_api_resolver_method(),
+        )
+
+    def test_registered_field_transformer(self):
+        # amount_of_entries is a SerializerMethodField, otherwise
+        # transformed to a generic scalar.
+        with mock.patch.dict(FieldTransformerMeta.registry):
+            FieldTransformerMeta.register(
+                serializers.SerializerMethodField,
+                IntegerValuedFieldTransformer,
+            )
+            self.assertIs(
+                IntegerValuedFieldTransformer,
+                FieldTransformerMeta.resolve(serializers.SerializerMethodField),
+            )
+            schema = SchemaFactory.create_from_api()
+        FieldTransformerMeta._resolved.clear()
+        author_type = schema.get_type_map()['author_type_2']
+        self.assertEqual(
+            'Int', author_type.fields['amount_of_entries'].type.of_type.name)
+        self.assertIsNone(
+            FieldTransformerMeta.resolve(serializers.SerializerMethodField))
+
+    def test_serializer_type_names(self):
+        type_names = SerializerTypeNames()
+        self.assertEqual(
+            'author_type', type_names.type_name('author', AuthorSerializer))
+        type_names.add('author', AuthorSerializer, 'author_type')
+        self.assertEqual(
+            'author_type', type_names.type_name('author', AuthorSerializer))
+        self.assertEqual(
+            'author_type_2', type_names.type_name('author', WrittenBySerializer))
+        type_names.add('author', WrittenBySerializer, 'author_type_2')
+        self.assertEqual(
+            'author_type_2', type_names.type_name('author', WrittenBySerializer))
+        self.assertEqual(
+            'post_type', type_names.type_name('post', PostSerializer))
+
     def test_schema_keys(self):
         self.assertEqual(
             {'author_type',
              'author_type_2',
              'post_type',
              'post__files_type',
-             'user_type'},
+             'user_type',
+             'author_type_2_page',
+             'post_type_page'},
             {x for x in self.schema.get_type_map().keys() if 'type' in x},
         )
 
 
+class TestSchemaCache(TestGraphWrapBase):
+    def test_schema_is_reused(self):
+        self.assertIs(schema(), schema())
+
+    def test_invalidate_schema(self):
+        cached_schema = schema()
+        invalidate_schema()
+        self.assertIsNot(cached_schema, schema())
+
+    def test_warm_up(self):
+        timings = schema_cache.warm_up()
+        self.assertEqual(
+            ['usable_views',
+             'collect_nested_serializers',
+             'build_types',
+             'build_schema'],
+            list(timings),
+        )
+        self.assertIs(schema_cache.get(), schema())
+
+    def test_warm_up_on_ready_only_when_enabled(self):
+        app_config = apps.get_app_config('graph_wrap_django_rest_framework')
+        with mock.patch.object(schema_cache, 'warm_up') as warm_up:
+            app_config.ready()
+            warm_up.assert_not_called()
+            with override_settings(GRAPH_WRAP_WARM_UP_SCHEMA=True):
+                app_config.ready()
+            warm_up.assert_called_once_with()
+
+    def test_schema_rebuilt_on_list_endpoint_prefix_change(self):
+        cached_schema = schema()
+        settings.LIST_ENDPOINT_RESOLVER_PREFIX = ''
+        try:
+            self.assertIsNot(cached_schema, schema())
+            self.assertIn('authors', schema().get_query_type().fields)
+        finally:
+            delattr(settings, 'LIST_ENDPOINT_RESOLVER_PREFIX')
+
+
+class TestUsableViews(TestGraphWrapBase):
+    def test_usable_view_index_reused(self):
+        view = SchemaFactory.usable_view('author-detail')
+        self.assertEqual('author', view.basename)
+        self.assertIs(view, SchemaFactory.usable_view('author-list'))
+        self.assertIs(view, SchemaFactory.usable_view('api:author-detail'))
+
+    def test_usable_view_index_rebuilt_on_urlconf_reload(self):
+        view = SchemaFactory.usable_view('author-detail')
+        clear_url_caches()
+        self.assertIsNot(view, SchemaFactory.usable_view('author-detail'))
+
+    def test_unknown_usable_view(self):
+        with self.assertRaises(KeyError):
+            SchemaFactory.usable_view('unknown-detail')
+
+
+class TestDocumentCache(TestGraphWrapBase):
+    def _post(self, query):
+        return self.client.post(
+            self.graphql_endpoint,
+            json.dumps({"query": query}),
+            content_type="application/json",
+        )
+
+    def test_document_reused(self):
+        query = '''
+            query authors {
+                all_authors {
+                    name
+                }
+                first: all_authors {
+                    age
+                }
+            }
+            '''
+        self.assertEqual(self._post(query).status_code, 200)
+        document = document_backend().document_from_string(schema(), query)
+        response = self._post(query)
+        self.assertEqual(response.status_code, 200)
+        self.assertIs(
+            document,
+            document_backend().document_from_string(schema(), query),
+        )
+        self.assertEqual(
+            {'all_authors': [{'name': 'PAUL'}, {'name': 'SCOTT'}],
+             'first': [{'age': 30}, {'age': 28}]},
+            json.loads(response.content)['data'],
+        )
+        self.assertEqual(
+            {'name': {}},
+            selection_tree_cache().get(
+                (query, 'authors', 'all_authors', 'all_authors')),
+        )
+        self.assertEqual(
+            {'age': {}},
+            selection_tree_cache().get(
+                (query, 'authors', 'all_authors', 'first')),
+        )
+
+    def test_documents_dropped_on_invalidate_schema(self):
+        query = '{ all_authors { name } }'
+        documents = document_backend()._documents
+        documents.clear()
+        self.assertEqual(self._post(query).status_code, 200)
+        self.assertEqual(1, len(documents))
+        self.assertNotIn(
+            schema(), [item for key in documents._items for item in key])
+        invalidate_schema()
+        self.assertEqual(0, len(documents))
+
+    def test_invalid_document_reused(self):
+        query = '''
+            query {
+                all_authors {
+                    unknown_field
+                }
+            }
+            '''
+        for _ in range(2):
+            response = self._post(query)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(
+                'unknown_field',
+                json.loads(response.content)['errors'][0]['message'],
+            )
+
+
+class TestPersistedQueries(TestGraphWrapBase):
+    query = '''
+        query {
+            all_authors {
+                name
+            }
+        }
+        '''
+
+    def setUp(self):
+        super(TestPersistedQueries, self).setUp()
+        queries_dir = tempfile.mkdtemp()
+        self.queries_path = os.path.join(queries_dir, 'queries.json')
+        with self.settings(GRAPH_WRAP_PERSISTED_QUERIES=self.queries_path):
+            self.query_id = persisted_query_store().add(self.query)
+
+    def _post(self, body):
+        with self.settings(GRAPH_WRAP_PERSISTED_QUERIES=self.queries_path):
+            return self.client.post(
+                self.graphql_endpoint,
+                json.dumps(body),
+                content_type="application/json",
+            )
+
+    def test_query_by_id(self):
+        response = self._post({"id": self.query_id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [{'name': 'PAUL'}, {'name': 'SCOTT'}],
+            json.loads(response.content)['data']['all_authors'],
+        )
+        # The selection tree was precomputed, and is never evicted.
+        selection_tree_cache().clear()
+        document = document_backend().document_from_string(
+            schema(), self.query)
+        operation = document.document_ast.definitions[0]
+        field = operation.selection_set.selections[0]
+        self.assertEqual(
+            {'name': {}},
+            selection_tree_cache().get(
+                selection_tree_key(self.query, operation, field)),
+        )
+
+    def test_apollo_persisted_query_extension(self):
+        response = self._post({
+            "extensions": {
+                "persistedQuery": {"version": 1, "sha256Hash": self.query_id},
+            },
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [{'name': 'PAUL'}, {'name': 'SCOTT'}],
+            json.loads(response.content)['data']['all_authors'],
+        )
+
+    def test_unknown_query_id(self):
+        response = self._post({"id": "unknown"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [{'message': 'PersistedQueryNotFound',
+              'extensions': {'code': 'PERSISTED_QUERY_NOT_FOUND'}}],
+            json.loads(response.content)['errors'],
+        )
+
+    def test_invalid_extensions(self):
+        response = self._post({"extensions": "not json"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [{'message': 'Extensions are invalid JSON.'}],
+            json.loads(response.content)['errors'],
+        )
+
+    def test_invalid_store_file(self):
+        with open(self.queries_path, 'w') as queries_file:
+            queries_file.write('{not json')
+        with self.settings(GRAPH_WRAP_PERSISTED_QUERIES=self.queries_path):
+            store = persisted_query_store()
+        store._queries = None
+        with self.assertLogs('graph_wrap.shared.persisted_queries', 'ERROR'):
+            response = self._post({"query": self.query})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({}, store.queries())
+
+    def test_recompile_unpins_selection_trees(self):
+        self._post({"id": self.query_id})
+        with self.settings(GRAPH_WRAP_PERSISTED_QUERIES=self.queries_path):
+            store = persisted_query_store()
+        pinned = set(selection_tree_cache()._pinned)
+        self.assertTrue(pinned)
+        store._queries = {}
+        store.compile(schema())
+        self.assertFalse(pinned & set(selection_tree_cache()._pinned))
+
+    @override_settings(GRAPH_WRAP_PERSISTED_QUERIES_ONLY=True)
+    def test_persisted_queries_only(self):
+        response = self._post({"query": self.query})
+        self.assertEqual(response.status_code, 200)
+        response = self._post({"query": "query { all_posts { content } }"})
+        self.assertEqual(response.status_code, 403)
+
+
+class TestSchemaSnapshot(TestGraphWrapBase):
+    def setUp(self):
+        super(TestSchemaSnapshot, self).setUp()
+        snapshot_dir = tempfile.mkdtemp()
+        self.snapshot_path = os.path.join(snapshot_dir, 'schema.json')
+        self.addCleanup(invalidate_schema)
+
+    def test_schema_loaded_from_snapshot(self):
+        with override_settings(GRAPH_WRAP_SCHEMA_SNAPSHOT=self.snapshot_path):
+            built_timings = dict()
+            built_schema = SchemaFactory.create_from_api(built_timings)
+            loaded_timings = dict()
+            loaded_schema = SchemaFactory.create_from_api(loaded_timings)
+        self.assertTrue(os.path.exists(self.snapshot_path))
+        self.assertIn('usable_views', built_timings)
+        self.assertEqual(['load_snapshot'], list(loaded_timings))
+        self.assertEqual(str(built_schema), str(loaded_schema))
+
+    def test_stale_snapshot_ignored(self):
+        with open(self.snapshot_path, 'w') as snapshot_file:
+            json.dump({'version': 1, 'key': 'stale'}, snapshot_file)
+        with override_settings(GRAPH_WRAP_SCHEMA_SNAPSHOT=self.snapshot_path):
+            timings = dict()
+            SchemaFactory.create_from_api(timings)
+        self.assertIn('usable_views', timings)
+
+    def test_fingerprint_covers_extra_kwargs(self):
+        fingerprint = api_fingerprint()
+        with mock.patch.object(
+                PostSerializer.Meta,
+                'extra_kwargs',
+                {'content': {'allow_null': True}},
+                create=True):
+            self.assertNotEqual(fingerprint, api_fingerprint())
+
+    def test_fingerprint_covers_library_versions(self):
+        fingerprint = api_fingerprint()
+        for version in ('rest_framework.VERSION', 'graphene.__version__'):
+            with mock.patch(version, '0.0.0'):
+                self.assertNotEqual(fingerprint, api_fingerprint())
+
+    def test_no_snapshot_for_overridden_serializer_class(self):
+        with mock.patch.object(
+                PostViewSet,
+                'get_serializer_class',
+                lambda view: PostSerializer,
+                create=True):
+            with override_settings(
+                    GRAPH_WRAP_SCHEMA_SNAPSHOT=self.snapshot_path):
+                with self.assertRaises(SnapshotError):
+                    api_fingerprint()
+                SchemaFactory.create_from_api()
+        self.assertFalse(os.path.exists(self.snapshot_path))
+
+    def test_query_with_snapshot_schema(self):
+        with override_settings(GRAPH_WRAP_SCHEMA_SNAPSHOT=self.snapshot_path):
+            SchemaFactory.create_from_api()
+            invalidate_schema()
+            query = '''
+                query {
+                    all_posts {
+                        content
+                        author {
+                            name
+                        }
+                    }
+                }
+                '''
+            response = self.client.post(
+                self.graphql_endpoint,
+                json.dumps({"query": query}),
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [{'content': 'My first post!', 'author': {'name': 'PAUL'}}],
+            json.loads(response.content)['data']['all_posts'],
+        )
+
+
 class TestGraphWrapApi(TestGraphWrapBase):
     def test_all_authors_query(self):
         query = '''
@@ -226,6 +622,83 @@ class TestGraphWrapApi(TestGraphWrapBase):
             all_posts_data,
         )
 
+    def test_all_authors_page_query(self):
+        query = '''
+            query {
+                all_authors_page(first: 1%s) {
+                    items {
+                        name
+                    }
+                    page_info {
+                        has_next_page
+                        has_previous_page
+                        end_cursor
+                        total_count
+                    }
+                }
+            }
+            '''
+        first_page = self._post_query(query % '')['all_authors_page']
+        self.assertEqual([{'name': 'PAUL'}], first_page['items'])
+        self.assertTrue(first_page['page_info']['has_next_page'])
+        self.assertFalse(first_page['page_info']['has_previous_page'])
+        self.assertEqual(2, first_page['page_info']['total_count'])
+
+        after = ', after: "{}"'.format(first_page['page_info']['end_cursor'])
+        second_page = self._post_query(query % after)['all_authors_page']
+        self.assertEqual([{'name': 'SCOTT'}], second_page['items'])
+        self.assertFalse(second_page['page_info']['has_next_page'])
+        self.assertTrue(second_page['page_info']['has_previous_page'])
+
+    def test_all_authors_page_limit_offset(self):
+        query = '''
+            query {
+                all_authors_page(limit: 5, offset: 1) {
+                    items {
+                        name
+                    }
+                }
+            }
+            '''
+        self.assertEqual(
+            [{'name': 'SCOTT'}],
+            self._post_query(query)['all_authors_page']['items'],
+        )
+
+    def test_all_authors_page_invalid_arguments(self):
+        query = '''
+            query {
+                all_authors_page(%s) {
+                    items {
+                        name
+                    }
+                }
+            }
+            '''
+        for arguments, message in [
+            ('first: 0', 'first and limit must be at least 1.'),
+            ('first: -1', 'first and limit must be at least 1.'),
+            ('limit: 0', 'first and limit must be at least 1.'),
+            ('limit: 5, offset: -1', 'offset must not be negative.'),
+        ]:
+            response = self.client.post(
+                self.graphql_endpoint,
+                json.dumps({'query': query % arguments}),
+                content_type="application/json",
+            )
+            content = json.loads(response.content)
+            self.assertIsNone(content['data']['all_authors_page'])
+            self.assertEqual(message, content['errors'][0]['message'])
+
+    def _post_query(self, query):
+        response = self.client.post(
+            self.graphql_endpoint,
+            json.dumps({'query': query}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)['data']
+
     def test_all_authors_all_posts_query(self):
         query = '''
             query {
@@ -376,6 +849,715 @@ class TestGraphWrapApi(TestGraphWrapBase):
         post_data = json.loads(response.content)['data']['post']
         self.assertEqual([], post_data['files'])
 
+    @override_settings(GRAPH_WRAP_IN_PROCESS_RESPONSES=True)
+    def test_in_process_responses(self):
+        query = '''
+            query {
+                all_authors {
+                    name
+                    entries {
+                        content
+                        files {
+                            name
+                        }
+                    }
+                }
+                post(id: %d) {
+                    rating
+                }
+            }
+            ''' % self.pauls_first_post.pk
+        body = {"query": query}
+        request_json = json.dumps(body)
+        response = self.client.post(
+            self.graphql_endpoint,
+            request_json,
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)['data']
+        self.assertEqual(
+            [{'name': 'PAUL',
+              'entries': [{'content': 'My first post!',
+                           'files': [{'name': 'elephant'},
+                                     {'name': 'giraffe'}]}]},
+             {'name': 'SCOTT', 'entries': []}],
+            data['all_authors'],
+        )
+        self.assertEqual(
+            {'rating': '7.00000000000000000000'}, data['post'])
+
+    @override_settings(
+        GRAPH_WRAP_STREAMING_LISTS=True, GRAPH_WRAP_STREAMING_CHUNK_SIZE=1)
+    def test_streamed_list_query(self):
+        query = '''
+            query {
+                authors: all_authors {
+                    ...author_fields
+                    posts: entries {
+                        content
+                        files {
+                            name
+                        }
+                    }
+                }
+            }
+            fragment author_fields on author_type_2 {
+                name
+            }
+            '''
+        response = self.client.post(
+            self.graphql_endpoint,
+            json.dumps({'query': query}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            [{'name': 'PAUL',
+              'posts': [{'content': 'My first post!',
+                         'files': [{'name': 'elephant'},
+                                   {'name': 'giraffe'}]}]},
+             {'name': 'SCOTT', 'posts': []}],
+            json.loads(b''.join(response.streaming_content))[
+                'data']['authors'],
+        )
+
+    @override_settings(GRAPH_WRAP_STREAMING_LISTS=True)
+    def test_several_root_fields_not_streamed(self):
+        query = '''
+            query {
+                all_authors {
+                    name
+                }
+                all_posts {
+                    content
+                }
+            }
+            '''
+        response = self.client.post(
+            self.graphql_endpoint,
+            json.dumps({'query': query}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+        self.assertEqual(
+            [{'name': 'PAUL'}, {'name': 'SCOTT'}],
+            json.loads(response.content)['data']['all_authors'],
+        )
+
+    @override_settings(GRAPH_WRAP_STREAMING_LISTS=True)
+    def test_paginated_list_not_streamed(self):
+        initial = APIView.initial
+        with mock.patch.object(
+                PostViewSet, 'pagination_class', LimitOffsetPagination):
+            with mock.patch.object(
+                    PostViewSet, 'initial', autospec=True,
+                    side_effect=initial) as initial_mock:
+                response = self.client.post(
+                    self.graphql_endpoint,
+                    json.dumps({'query': '{ all_posts { content } }'}),
+                    content_type="application/json",
+                )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+        self.assertEqual(
+            [{'content': 'My first post!'}],
+            json.loads(response.content)['data']['all_posts'],
+        )
+        # The view's checks only ran for the usual execution.
+        self.assertEqual(1, initial_mock.call_count)
+
+    @override_settings(GRAPH_WRAP_CONCURRENT_ROOT_FIELDS=4)
+    def test_concurrent_root_fields(self):
+        query = '''
+            query {
+                all_authors {
+                    name
+                }
+                all_posts {
+                    content
+                    author {
+                        name
+                    }
+                }
+                post(id: %d) {
+                    content
+                }
+            }
+            ''' % self.pauls_first_post.pk
+        dispatch_threads = dict()
+        get_response = QueryResolver._get_response
+
+        def recording_get_response(resolver, request, **kwargs):
+            dispatch_threads[resolver._field_name] = (
+                threading.current_thread().name)
+            return get_response(resolver, request, **kwargs)
+
+        with mock.patch.object(
+                QueryResolver, '_get_response', recording_get_response):
+            response = self.client.post(
+                self.graphql_endpoint,
+                json.dumps({'query': query}),
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)['data']
+        self.assertEqual(
+            [{'name': 'PAUL'}, {'name': 'SCOTT'}], data['all_authors'])
+        self.assertEqual(
+            [{'content': 'My first post!', 'author': {'name': 'PAUL'}}],
+            data['all_posts'],
+        )
+        self.assertEqual({'content': 'My first post!'}, data['post'])
+        self.assertTrue(dispatch_threads['all_authors'].startswith('graph_wrap'))
+        self.assertTrue(dispatch_threads['all_posts'].startswith('graph_wrap'))
+
+    def test_identical_dispatches_memoized(self):
+        query = '''
+            query {
+                first: all_authors {
+                    name
+                }
+                second: all_authors {
+                    ...author_name
+                }
+                other: all_authors {
+                    age
+                }
+            }
+            fragment author_name on author_type_2 {
+                name
+            }
+            '''
+        with mock.patch.object(
+                QueryResolver,
+                '_get_response',
+                autospec=True,
+                side_effect=QueryResolver._get_response,
+        ) as get_response:
+            response = self.client.post(
+                self.graphql_endpoint,
+                json.dumps({'query': query}),
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)['data']
+        self.assertEqual(data['first'], data['second'])
+        self.assertEqual([{'age': 30}, {'age': 28}], data['other'])
+        self.assertEqual(2, get_response.call_count)
+
+    @override_settings(GRAPH_WRAP_RESULT_CACHE={'TIMEOUTS': {'author': 60}})
+    def test_result_cache(self):
+        cache.clear()
+        query = '''
+            query {
+                all_authors {
+                    name
+                }
+            }
+            '''
+
+        def all_authors():
+            response = self.client.post(
+                self.graphql_endpoint,
+                json.dumps({'query': query}),
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 200)
+            return json.loads(response.content)['data']['all_authors']
+
+        self.assertEqual([{'name': 'PAUL'}, {'name': 'SCOTT'}], all_authors())
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [{'name': 'PAUL'}, {'name': 'SCOTT'}], all_authors())
+        self.paul.name = 'Paolo'
+        self.paul.save()
+        self.assertEqual(
+            [{'name': 'PAOLO'}, {'name': 'SCOTT'}], all_authors())
+
+    @override_settings(GRAPH_WRAP_RESULT_CACHE={'TIMEOUTS': {'post': 60}})
+    def test_result_cache_batched_lookups(self):
+        cache.clear()
+        second_post = Post.objects.create(
+            content='Second',
+            author=self.scott,
+            date=datetime.datetime.now(),
+        )
+        query = '''
+            query {
+                first: post(id: %d) {
+                    content
+                }
+                second: post(id: %d) {
+                    content
+                }
+            }
+            ''' % (self.pauls_first_post.pk, second_post.pk)
+
+        def post_query(query):
+            response = self.client.post(
+                self.graphql_endpoint,
+                json.dumps({'query': query}),
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 200)
+            return json.loads(response.content)['data']
+
+        posts = {'first': {'content': 'My first post!'},
+                 'second': {'content': 'Second'}}
+        self.assertEqual(posts, post_query(query))
+        with self.assertNumQueries(0):
+            self.assertEqual(posts, post_query(query))
+            # Lone lookups share the cached data of batched ones.
+            self.assertEqual(
+                {'post': {'content': 'Second'}},
+                post_query('{ post(id: %d) { content } }' % second_post.pk),
+            )
+        second_post.content = 'Second, edited'
+        second_post.save()
+        self.assertEqual(
+            {'first': {'content': 'My first post!'},
+             'second': {'content': 'Second, edited'}},
+            post_query(query),
+        )
+
+    @override_settings(GRAPH_WRAP_RESULT_CACHE={'TIMEOUTS': {'author': 60}})
+    def test_result_cache_invalidation_receivers(self):
+        with mock.patch(
+                'graph_wrap.shared.result_cache.connect_invalidation') as connect:
+            connect_cached_resources(_resource_models())
+        connect.assert_called_once_with(Author)
+        with mock.patch(
+                'graph_wrap.shared.result_cache.invalidate_result_cache'
+        ) as invalidate:
+            Media.objects.create(name='zebra')
+        invalidate.assert_not_called()
+
+    def test_request_environ_not_mutated(self):
+        query = '''
+            query {
+                all_authors {
+                    name
+                }
+                all_posts {
+                    content
+                }
+            }
+            '''
+        request = RequestFactory().post(
+            self.graphql_endpoint,
+            json.dumps({'query': query}),
+            content_type="application/json",
+        )
+        request.user = AnonymousUser()
+        content_length = request.environ['CONTENT_LENGTH']
+        response = graphql_view(request)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)['data']
+        self.assertEqual([{'name': 'PAUL'}, {'name': 'SCOTT'}], data['all_authors'])
+        self.assertEqual([{'content': 'My first post!'}], data['all_posts'])
+        self.assertNotIn('selected_fields', request.environ)
+        self.assertEqual('POST', request.environ['REQUEST_METHOD'])
+        self.assertEqual(content_length, request.environ['CONTENT_LENGTH'])
+
+    @override_settings(
+        GRAPH_WRAP_TRACER='tests.django_rest_framework_api.test_api.RecordingTracer')
+    def test_traced_phases(self):
+        RecordingTracer.events = []
+        query = '''
+            query {
+                all_posts {
+                    content
+                    files {
+                        name
+                    }
+                }
+            }
+            '''
+        response = self.client.post(
+            self.graphql_endpoint,
+            json.dumps({'query': query}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [('all_posts', phase) for phase in PHASES],
+            [(event.field_name, event.phase)
+             for event in RecordingTracer.events],
+        )
+        queries = {
+            event.phase: event.queries for event in RecordingTracer.events}
+        self.assertEqual(
+            {'select': 0, 'request': 0, 'dispatch': 2, 'render': 0,
+             'decode': 0},
+            queries,
+        )
+        self.assertTrue(
+            all(event.duration >= 0 for event in RecordingTracer.events))
+
+    @override_settings(GRAPH_WRAP_QUERY_LIMITS={'MAX_DEPTH': 3})
+    def test_query_depth_limit(self):
+        query = '''
+            query {
+                all_authors {
+                    entries {
+                        files {
+                            name
+                        }
+                    }
+                }
+            }
+            '''
+        response = self.client.post(
+            self.graphql_endpoint,
+            json.dumps({'query': query}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            'Query depth of 4 exceeds the maximum of 3.',
+            json.loads(response.content)['errors'][0]['message'],
+        )
+
+    @override_settings(GRAPH_WRAP_QUERY_LIMITS={
+        'MAX_COST': 1000,
+        'DEFAULT_LIST_SIZE': 10,
+        'LIST_SIZES': {'all_authors': 100},
+    })
+    def test_query_cost_limit(self):
+        query = '''
+            query {
+                all_authors {
+                    name
+                    entries {
+                        content
+                    }
+                }
+            }
+            '''
+        with mock.patch.object(QueryResolver, '_get_response') as dispatch:
+            response = self.client.post(
+                self.graphql_endpoint,
+                json.dumps({'query': query}),
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            'Query cost of 2200 exceeds the maximum of 1000.',
+            json.loads(response.content)['errors'][0]['message'],
+        )
+        self.assertFalse(dispatch.called)
+
+        page_query = '''
+            query {
+                all_authors_page(first: 10) {
+                    items {
+                        name
+                        entries {
+                            content
+                        }
+                    }
+                }
+            }
+            '''
+        response = self.client.post(
+            self.graphql_endpoint,
+            json.dumps({'query': page_query}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(GRAPH_WRAP_QUERY_LIMITS={
+        'MAX_COST': 100,
+        'DEFAULT_LIST_SIZE': 100,
+    })
+    def test_query_cost_ignores_invalid_page_sizes(self):
+        for first in (-1, 0):
+            page_query = '''
+                query {
+                    all_posts_page(first: %d) {
+                        items {
+                            content
+                            written_by {
+                                name
+                            }
+                        }
+                    }
+                }
+                ''' % first
+            response = self.client.post(
+                self.graphql_endpoint,
+                json.dumps({'query': page_query}),
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(
+                'Query cost of 401 exceeds the maximum of 100.',
+                json.loads(response.content)['errors'][0]['message'],
+            )
+
+    def test_all_posts_nested_query_count(self):
+        for content in ['Second', 'Third']:
+            post = Post.objects.create(
+                content=content,
+                author=self.scott,
+                date=datetime.datetime.now(),
+            )
+            post.files.add(self.picture)
+        query = '''
+            query {
+                all_posts {
+                    written_by {
+                        name
+                    }
+                    author {
+                        user {
+                            username
+                        }
+                    }
+                    files {
+                        name
+                    }
+                }
+            }
+            '''
+        body = {"query": query}
+        request_json = json.dumps(body)
+        # One query for the posts joined with their authors and
+        # users, one to prefetch the files.
+        with self.assertNumQueries(2):
+            response = self.client.post(
+                self.graphql_endpoint,
+                request_json,
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        all_posts_data = json.loads(
+            response.content)['data']['all_posts']
+        self.assertEqual(3, len(all_posts_data))
+        self.assertEqual(
+            {'written_by': {'name': 'SCOTT'},
+             'author': {'user': {'username': 'Scott'}},
+             'files': [{'name': 'elephant'}]},
+            all_posts_data[2],
+        )
+
+    def test_batched_single_item_lookups(self):
+        second_post = Post.objects.create(
+            content='Second',
+            author=self.scott,
+            date=datetime.datetime.now(),
+        )
+        query = '''
+            query {
+                first: post(id: %d) {
+                    content
+                }
+                second: post(id: %d) {
+                    content
+                }
+                missing: post(id: %d) {
+                    content
+                }
+            }
+            ''' % (
+                self.pauls_first_post.pk,
+                second_post.pk,
+                second_post.pk + 1,
+            )
+        body = {"query": query}
+        request_json = json.dumps(body)
+        # One query for the batch, then the missing post is
+        # looked up on its own to report the error.
+        with self.assertNumQueries(2):
+            response = self.client.post(
+                self.graphql_endpoint,
+                request_json,
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        content = json.loads(response.content)
+        self.assertEqual(
+            {'first': {'content': 'My first post!'},
+             'second': {'content': 'Second'},
+             'missing': None},
+            content['data'],
+        )
+        self.assertEqual(['missing'], content['errors'][0]['path'])
+
+    def test_custom_lookups_not_batched(self):
+        def get_object(view):
+            return GenericAPIView.get_object(view)
+
+        def retrieve(view, request, *args, **kwargs):
+            return RetrieveModelMixin.retrieve(view, request, *args, **kwargs)
+
+        second_post = Post.objects.create(
+            content='Second',
+            author=self.scott,
+            date=datetime.datetime.now(),
+        )
+        query = '''
+            query {
+                first: post(id: %d) {
+                    content
+                }
+                second: post(id: %d) {
+                    content
+                }
+            }
+            ''' % (self.pauls_first_post.pk, second_post.pk)
+        for name, method in [('get_object', get_object),
+                             ('retrieve', retrieve)]:
+            with mock.patch.object(PostViewSet, name, method):
+                # One retrieve, through the custom method, per lookup.
+                with self.assertNumQueries(2):
+                    response = self.client.post(
+                        self.graphql_endpoint,
+                        json.dumps({'query': query}),
+                        content_type="application/json",
+                    )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                {'first': {'content': 'My first post!'},
+                 'second': {'content': 'Second'}},
+                json.loads(response.content)['data'],
+            )
+
+    @override_settings(GRAPH_WRAP_BATCH_RELATED_VIEWS=True)
+    def test_all_posts_batched_related_views(self):
+        for content in ['Second', 'Third']:
+            Post.objects.create(
+                content=content,
+                author=self.scott,
+                date=datetime.datetime.now(),
+            )
+        query = '''
+            query {
+                all_posts {
+                    content
+                    author {
+                        name
+                        user {
+                            username
+                        }
+                    }
+                }
+            }
+            '''
+        body = {"query": query}
+        request_json = json.dumps(body)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                self.graphql_endpoint,
+                request_json,
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        all_posts_data = json.loads(
+            response.content)['data']['all_posts']
+        self.assertEqual(
+            [{'content': 'My first post!',
+              'author': {'name': 'PAUL', 'user': {'username': 'Paul'}}},
+             {'content': 'Second',
+              'author': {'name': 'SCOTT', 'user': {'username': 'Scott'}}},
+             {'content': 'Third',
+              'author': {'name': 'SCOTT', 'user': {'username': 'Scott'}}}],
+            all_posts_data,
+        )
+        # The posts, then their authors (joined with their users)
+        # from the AuthorViewSet queryset.
+        self.assertEqual(2, len(queries))
+        self.assertNotIn('"tests_author"', queries[0]['sql'])
+        self.assertIn('"tests_author"."id" IN', queries[1]['sql'])
+        self.assertIn('"auth_user"', queries[1]['sql'])
+
+    @override_settings(GRAPH_WRAP_COLUMN_PRUNING=True)
+    def test_all_posts_column_pruning(self):
+        query = '''
+            query {
+                all_posts {
+                    content
+                    author {
+                        age
+                        user {
+                            username
+                        }
+                    }
+                }
+            }
+            '''
+        body = {"query": query}
+        request_json = json.dumps(body)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                self.graphql_endpoint,
+                request_json,
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [{'content': 'My first post!',
+              'author': {'age': 30, 'user': {'username': 'Paul'}}}],
+            json.loads(response.content)['data']['all_posts'],
+        )
+        self.assertEqual(1, len(queries))
+        sql = queries[0]['sql']
+        self.assertIn('"tests_post"."content"', sql)
+        self.assertIn('"tests_author"."age"', sql)
+        self.assertIn('"auth_user"."username"', sql)
+        self.assertNotIn('"tests_post"."date"', sql)
+        self.assertNotIn('"tests_author"."name"', sql)
+        self.assertNotIn('"auth_user"."email"', sql)
+
+    @override_settings(GRAPH_WRAP_COLUMN_PRUNING=True)
+    def test_column_pruning_falls_back_for_method_fields(self):
+        query = '''
+            query {
+                all_authors {
+                    name
+                }
+            }
+            '''
+        body = {"query": query}
+        request_json = json.dumps(body)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                self.graphql_endpoint,
+                request_json,
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [{'name': 'PAUL'}, {'name': 'SCOTT'}],
+            json.loads(response.content)['data']['all_authors'],
+        )
+        # 'name' is sourced from the get_name method, so every
+        # column is loaded.
+        self.assertIn('"tests_author"."age"', queries[0]['sql'])
+
+    @override_settings(GRAPH_WRAP_COLUMN_PRUNING=True)
+    def test_column_pruning_skips_view_select_related(self):
+        query = '{ all_posts { content } }'
+        with mock.patch.object(
+                PostViewSet, 'queryset', Post.objects.select_related('author')):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    self.graphql_endpoint,
+                    json.dumps({'query': query}),
+                    content_type="application/json",
+                )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [{'content': 'My first post!'}],
+            json.loads(response.content)['data']['all_posts'],
+        )
+        # The view's own join is kept, and nothing is deferred.
+        self.assertIn('"tests_author"."age"', queries[0]['sql'])
+        self.assertIn('"tests_post"."rating"', queries[0]['sql'])
+
     def test_query_with_directive(self):
         pass
 
@@ -0,0 +1,246 @@
+from __future__ import unicode_literals
+
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+
+from tests.models import Author, Media, Post
+
+BACKENDS = {
+    'django_rest_framework': dict(
+        endpoint='/django_rest/graphql/',
+        posts_field='entries',
+        # 'author' on a post is a HyperlinkedRelatedField.
+        hyperlinked_query='{ all_posts { content author { name age } } }',
+    ),
+    'tastypie': dict(
+        endpoint='/tastypie/v1/graphql/',
+        posts_field='posts',
+        hyperlinked_query='{ all_posts { content author { name age } } }',
+    ),
+}
+
+
+class Command(BaseCommand):
+    """Benchmark the graph_wrap resolution paths on the tests app.
+
+    A throwaway SQLite test database is created and seeded with
+    --authors authors, each with --posts posts of --files files, then
+    every scenario is run against each backend installed: the schema
+    build, a single item, a list, nested and hyperlinked expansions
+    and a fragment heavy query. For each, the latency over --repeat
+    runs (after a warm-up run), the number of SQL queries and the
+    peak memory allocated (per tracemalloc) are reported, as a table
+    or, with --json, as a JSON file to compare between revisions:
+
+        DJANGO_SETTINGS_MODULE=tests.settings PYTHONPATH=tests \\
+            python -m django benchmark --authors 200 --json before.json
+
+    (run from the root of the repository).
+    """
+    help = 'Benchmark graph_wrap resolution paths on the tests app models.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=10)
+        parser.add_argument('--files', type=int, default=2)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--backend', action='append', choices=sorted(BACKENDS),
+            help='Only benchmark this backend (may be repeated).')
+        parser.add_argument('--json', help='Also write the results here.')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False)
+        try:
+            single_post_id = _seed(
+                options['authors'], options['posts'], options['files'])
+            results = []
+            for backend in options['backend'] or _installed_backends():
+                benchmark = Benchmark(
+                    backend, BACKENDS[backend], options['repeat'])
+                results.extend(benchmark.run(single_post_id))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        self._report(results)
+        if options['json']:
+            with open(options['json'], 'w') as results_file:
+                json.dump(dict(options=_options(options), results=results),
+                          results_file, indent=2)
+
+    def _report(self, results):
+        row = '{:<22} {:<22} {:>10} {:>10} {:>10} {:>8} {:>12}'
+        self.stdout.write(row.format(
+            'backend', 'scenario', 'median ms', 'min ms', 'max ms',
+            'queries', 'peak KiB'))
+        for result in results:
+            self.stdout.write(row.format(
+                result['backend'],
+                result['scenario'],
+                '{:.2f}'.format(result['median_ms']),
+                '{:.2f}'.format(result['min_ms']),
+                '{:.2f}'.format(result['max_ms']),
+                result['queries'],
+                '{:.0f}'.format(result['peak_kib']),
+            ))
+
+
+class Benchmark(object):
+    """The scenarios of one backend."""
+    def __init__(self, backend, config, repeat):
+        self._backend = backend
+        self._config = config
+        self._repeat = repeat
+        self._client = Client()
+        module = __import__(
+            'graph_wrap.{}'.format(backend), fromlist=['schema'])
+        self._schema = module.schema
+        self._invalidate_schema = module.invalidate_schema
+
+    def run(self, single_post_id):
+        yield self._measure('schema build', self._build_schema)
+        type_names = self._type_names()
+        posts_field = self._config['posts_field']
+        queries = [
+            ('single item',
+             '{ post(id: %d) { content date rating } }' % single_post_id),
+            ('list', '{ all_posts { content date rating } }'),
+            ('nested',
+             '{ all_authors { name %s { content files { name } } } }'
+             % posts_field),
+            ('hyperlinked', self._config['hyperlinked_query']),
+            ('fragments', '''
+                {
+                    all_authors { ...author %s { ...post } }
+                }
+                fragment author on %s { name age }
+                fragment post on %s { content rating files { ...file } }
+                fragment file on %s { name size }
+                ''' % ((posts_field,) + type_names)),
+        ]
+        for scenario, query in queries:
+            yield self._measure(scenario, self._query_function(query))
+
+    def _build_schema(self):
+        self._invalidate_schema()
+        self._schema()
+
+    def _type_names(self):
+        query_type = self._schema().get_query_type()
+        author_type = _named_type(query_type.fields['all_authors'].type)
+        post_type = _named_type(
+            author_type.fields[self._config['posts_field']].type)
+        file_type = _named_type(post_type.fields['files'].type)
+        return author_type.name, post_type.name, file_type.name
+
+    def _query_function(self, query):
+        body = json.dumps({'query': query})
+
+        def run_query():
+            response = self._client.post(
+                self._config['endpoint'],
+                body,
+                content_type='application/json',
+            )
+            content = json.loads(response.content)
+            if response.status_code != 200 or 'errors' in content:
+                raise RuntimeError(
+                    'Query failed ({}): {}'.format(self._backend, content))
+        return run_query
+
+    def _measure(self, scenario, function):
+        function()
+        latencies = []
+        for _ in range(self._repeat):
+            start = time.perf_counter()
+            function()
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries = []
+
+        def count_query(execute, sql, *args):
+            queries.append(sql)
+            return execute(sql, *args)
+
+        with connection.execute_wrapper(count_query):
+            function()
+        tracemalloc.start()
+        try:
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return dict(
+            backend=self._backend,
+            scenario=scenario,
+            median_ms=statistics.median(latencies),
+            min_ms=min(latencies),
+            max_ms=max(latencies),
+            queries=len(queries),
+            peak_kib=peak / 1024.0,
+        )
+
+
+def _seed(authors, posts, files):
+    """Seed the database, returning the id of a post."""
+    Media.objects.bulk_create([
+        Media(name='file {}'.format(i), content_type='jpg', size=i)
+        for i in range(files)
+    ])
+    # (bulk_create does not set the auto primary keys on SQLite.)
+    media_ids = list(Media.objects.values_list('pk', flat=True))
+    author_objects = Author.objects.bulk_create([
+        Author(name='author {}'.format(i), age=20 + i % 50)
+        for i in range(authors)
+    ])
+    now = timezone.now()
+    Post.objects.bulk_create([
+        Post(
+            content='post {} of {}'.format(i, author.name),
+            author=author,
+            date=now,
+            rating='{}.00'.format(i % 10),
+        )
+        for author in author_objects for i in range(posts)
+    ])
+    through = Post.files.through
+    through.objects.bulk_create([
+        through(post_id=post_id, media_id=media_id)
+        for post_id in Post.objects.values_list('pk', flat=True)
+        for media_id in media_ids
+    ])
+    return Post.objects.values_list('pk', flat=True).first()
+
+
+def _named_type(graphql_type):
+    while hasattr(graphql_type, 'of_type'):
+        graphql_type = graphql_type.of_type
+    return graphql_type
+
+
+def _installed_backends():
+    backends = []
+    for backend, module in [
+            ('django_rest_framework', 'rest_framework'),
+            ('tastypie', 'tastypie')]:
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        backends.append(backend)
+    return backends
+
+
+def _options(options):
+    return {
+        name: options[name]
+        for name in ('authors', 'posts', 'files', 'repeat')
+    }
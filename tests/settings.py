@@ -47,6 +47,7 @@ except ImportError:
     pass
 else:
     INSTALLED_APPS.append('rest_framework')
+    INSTALLED_APPS.append('graph_wrap.django_rest_framework.apps.GraphWrapConfig')
 
 
 try:
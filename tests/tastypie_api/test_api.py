@@ -2,11 +2,20 @@ from __future__ import unicode_literals
 
 import datetime
 import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
+from tastypie.resources import ModelResource
 from tastypie.test import ResourceTestCaseMixin
 
-from django.test import TransactionTestCase
+from django.db import connection
+from django.test import (
+    RequestFactory, TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
 
+from graph_wrap.tastypie import schema
+from graph_wrap.tastypie.query_resolver import DETAIL_LOOKUP_METHODS
+from tests.tastypie_api.api import AuthorResource, PostResource
 from tests.models import Author, Post, Media
 
 
@@ -60,6 +69,64 @@ class TestApi(ResourceTestCaseMixin, TransactionTestCase):
             all_authors_data,
         )
 
+    def test_all_authors_page_query(self):
+        query = '''
+            query {
+                all_authors_page(first: 1%s) {
+                    items {
+                        name
+                    }
+                    page_info {
+                        has_next_page
+                        end_cursor
+                        total_count
+                    }
+                }
+            }
+            '''
+        first_page = self._post_query(query % '')['all_authors_page']
+        self.assertEqual([{'name': 'Paul'}], first_page['items'])
+        self.assertTrue(first_page['page_info']['has_next_page'])
+        self.assertEqual(2, first_page['page_info']['total_count'])
+
+        after = ', after: "{}"'.format(first_page['page_info']['end_cursor'])
+        second_page = self._post_query(query % after)['all_authors_page']
+        self.assertEqual([{'name': 'Scott'}], second_page['items'])
+        self.assertFalse(second_page['page_info']['has_next_page'])
+
+    def test_all_authors_page_invalid_arguments(self):
+        query = '''
+            query {
+                all_authors_page(%s) {
+                    items {
+                        name
+                    }
+                }
+            }
+            '''
+        for arguments, message in [
+            ('first: 0', 'first and limit must be at least 1.'),
+            ('first: -1', 'first and limit must be at least 1.'),
+            ('limit: 5, offset: -1', 'offset must not be negative.'),
+        ]:
+            response = self.client.post(
+                self.graphql_endpoint,
+                json.dumps({'query': query % arguments}),
+                content_type="application/json",
+            )
+            content = json.loads(response.content)
+            self.assertIsNone(content['data']['all_authors_page'])
+            self.assertEqual(message, content['errors'][0]['message'])
+
+    def _post_query(self, query):
+        response = self.client.post(
+            self.graphql_endpoint,
+            json.dumps({'query': query}),
+            content_type="application/json",
+        )
+        self.assertHttpOK(response)
+        return json.loads(response.content)['data']
+
     def test_all_authors_all_posts_query(self):
         query = '''
             query {
@@ -242,6 +309,240 @@ class TestApi(ResourceTestCaseMixin, TransactionTestCase):
         self.assertEqual('My first post!', post_data['content'])
         self.assertEqual({'name': 'Paul'}, post_data['author'])
 
+    def test_nested_self_referencing_query(self):
+        query = '''
+            query {
+                all_posts {
+                    content
+                    author {
+                        name
+                        posts {
+                            content
+                            files {
+                                name
+                            }
+                        }
+                    }
+                }
+            }
+            '''
+        body = {"query": query}
+        request_json = json.dumps(body)
+        response = self.client.post(
+            self.graphql_endpoint,
+            request_json,
+            content_type="application/json",
+        )
+        self.assertHttpOK(response)
+        post_data = json.loads(
+            response.content)['data']['all_posts'][0]
+        self.assertEqual(
+            {'name': 'Paul',
+             'posts': [{'content': 'My first post!',
+                        'files': [{'name': 'elephant'},
+                                  {'name': 'giraffe'}]}]},
+            post_data['author'],
+        )
+
+    def test_concurrent_field_selections(self):
+        query = schema().get_query_type().graphene_type
+        resource = query.resolve_all_authors._selected_fields_api
+        fields = dict(resource.fields)
+
+        def dispatch(selected_fields):
+            request = RequestFactory().get('/')
+            request.environ['selected_fields'] = selected_fields
+            try:
+                response = resource.dispatch_list(request)
+            finally:
+                connection.close()
+            return json.loads(response.content)['objects']
+
+        selections = [{'name': {}}, {'age': {}, 'posts': {'content': {}}}] * 10
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(dispatch, selections))
+        for selected_fields, objects in zip(selections, results):
+            self.assertEqual(2, len(objects))
+            for obj in objects:
+                self.assertEqual(set(selected_fields), set(obj))
+        self.assertEqual(fields, resource.fields)
+
+    @override_settings(GRAPH_WRAP_IN_PROCESS_RESPONSES=True)
+    def test_in_process_responses(self):
+        query = '''
+            query {
+                all_posts {
+                    content
+                    rating
+                    author {
+                        name
+                    }
+                    files {
+                        name
+                    }
+                }
+            }
+            '''
+        body = {"query": query}
+        request_json = json.dumps(body)
+        response = self.client.post(
+            self.graphql_endpoint,
+            request_json,
+            content_type="application/json",
+        )
+        self.assertHttpOK(response)
+        self.assertEqual(
+            [{'content': 'My first post!',
+              'rating': '7.00000000000000000000',
+              'author': {'name': 'Paul'},
+              'files': [{'name': 'elephant'}, {'name': 'giraffe'}]}],
+            json.loads(response.content)['data']['all_posts'],
+        )
+
+    def test_custom_detail_lookups_not_batched(self):
+        second_post = Post.objects.create(
+            content='Second',
+            author=self.scott,
+            date=datetime.datetime.now(),
+        )
+        query = '''
+            query {
+                first: post(id: %d) {
+                    content
+                }
+                second: post(id: %d) {
+                    content
+                }
+            }
+            ''' % (self.pauls_first_post.pk, second_post.pk)
+        for name in DETAIL_LOOKUP_METHODS:
+            stock_method = getattr(ModelResource, name)
+
+            def method(resource, *args, **kwargs):
+                return stock_method(resource, *args, **kwargs)
+
+            with mock.patch.object(PostResource, name, method, create=True):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.post(
+                        self.graphql_endpoint,
+                        json.dumps({'query': query}),
+                        content_type="application/json",
+                    )
+            self.assertHttpOK(response)
+            self.assertEqual(
+                {'first': {'content': 'My first post!'},
+                 'second': {'content': 'Second'}},
+                json.loads(response.content)['data'],
+            )
+            post_queries = [
+                query['sql'] for query in queries
+                if query['sql'].startswith('SELECT "tests_post"')]
+            # One detail lookup, through the custom method, per alias.
+            self.assertEqual(2, len(post_queries), name)
+
+    def test_batched_single_item_lookups(self):
+        second_post = Post.objects.create(
+            content='Second',
+            author=self.scott,
+            date=datetime.datetime.now(),
+        )
+        query = '''
+            query {
+                first: post(id: %d) {
+                    content
+                    author {
+                        name
+                    }
+                }
+                second: post(id: %d) {
+                    content
+                    author {
+                        name
+                    }
+                }
+                missing: post(id: %d) {
+                    content
+                }
+            }
+            ''' % (
+                self.pauls_first_post.pk,
+                second_post.pk,
+                second_post.pk + 1,
+            )
+        body = {"query": query}
+        request_json = json.dumps(body)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                self.graphql_endpoint,
+                request_json,
+                content_type="application/json",
+            )
+        self.assertHttpOK(response)
+        content = json.loads(response.content)
+        self.assertEqual(
+            {'first': {'content': 'My first post!', 'author': {'name': 'Paul'}},
+             'second': {'content': 'Second', 'author': {'name': 'Scott'}},
+             'missing': None},
+            content['data'],
+        )
+        self.assertEqual(['missing'], content['errors'][0]['path'])
+        post_queries = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT "tests_post"')]
+        # The two posts with an author selection are fetched
+        # together, the missing one on its own.
+        self.assertEqual(2, len(post_queries))
+        self.assertIn(' IN ', post_queries[0])
+
+    @override_settings(GRAPH_WRAP_COLUMN_PRUNING=True)
+    def test_column_pruning(self):
+        query = '''
+            query {
+                all_posts {
+                    content
+                    author {
+                        name
+                    }
+                }
+            }
+            '''
+        body = {"query": query}
+        request_json = json.dumps(body)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                self.graphql_endpoint,
+                request_json,
+                content_type="application/json",
+            )
+        self.assertHttpOK(response)
+        self.assertEqual(
+            [{'content': 'My first post!', 'author': {'name': 'Paul'}}],
+            json.loads(response.content)['data']['all_posts'],
+        )
+        post_queries = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT "tests_post"')]
+        self.assertEqual(1, len(post_queries))
+        self.assertIn('"tests_post"."content"', post_queries[0])
+        self.assertIn('"tests_post"."author_id"', post_queries[0])
+        self.assertNotIn('"tests_post"."date"', post_queries[0])
+
+    def test_nested_detail_fields_in_list_query(self):
+        # Related resources are dehydrated as details, also in lists.
+        query = '{ all_posts { author { name age } } }'
+        with mock.patch.object(
+                AuthorResource.base_fields['age'], 'use_in', 'detail'):
+            response = self.client.post(
+                self.graphql_endpoint,
+                json.dumps({'query': query}),
+                content_type="application/json",
+            )
+        self.assertHttpOK(response)
+        self.assertEqual(
+            [{'author': {'name': 'Paul', 'age': 30}}],
+            json.loads(response.content)['data']['all_posts'],
+        )
+
     def test_query_with_directive(self):
         pass
 